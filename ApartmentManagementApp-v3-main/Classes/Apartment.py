@@ -1,7 +1,22 @@
+from datetime import datetime
+from sqlalchemy.orm import validates
 from Classes.config import db  # Import db from db.py
+from Classes.geo import grid_cell, parse_coordinates
+from Classes.media import VARIANTS, MediaSet, pick_variant, requested_width
+from Classes.serializers import Field, FieldSet, media_url
+from Classes.User import USER_CONTACT, USER_FIELDS
 
 class Apartment(db.Model):
     __tablename__ = 'apartments'  # Explicitly define the table name
+    __table_args__ = (
+        db.Index('ix_apartments_status_type_city_price', 'status', 'type', 'city', 'price'),
+        db.Index('ix_apartments_city_area', 'city', 'area'),
+        db.Index('ix_apartments_created_at_id', 'created_at', 'id'),
+        db.Index('ix_apartments_geo_cell', 'geo_cell'),
+        # Backs /apartments/search on MySQL; other databases use Classes/search_index.py
+        db.Index('ft_apartments_text', 'location', 'city', 'unit_number', 'description',
+                 mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     owner_id = db.Column(db.BigInteger, db.ForeignKey('users.id'), nullable=False)
@@ -14,10 +29,16 @@ class Apartment(db.Model):
     type = db.Column(db.Enum('For Sale', 'For Rent', name='apartment_type'), nullable=False)
     description = db.Column(db.Text)
     photos = db.Column(db.JSON, nullable=True)  # ✅ JSON field for multiple images
+    photo_variants = db.Column(db.JSON, nullable=True)  # resized copies of photos, see Classes/media.py
     parking_availability = db.Column(db.Boolean, default=False)  # ✅ Boolean for parking
     video = db.Column(db.String(500), nullable=True)  # ✅ New field for video link
     map_location = db.Column(db.String(500), nullable=True)  # ✅ New field for map location
+    # Parsed from map_location, see Classes/geo.py
+    latitude = db.Column(db.Numeric(9, 6), nullable=True)
+    longitude = db.Column(db.Numeric(9, 6), nullable=True)
+    geo_cell = db.Column(db.BigInteger, nullable=True)
     status = db.Column(db.Enum('Available', 'Sold', 'Rented', name='apartment_status'), default='Available')
+    status_changed_at = db.Column(db.DateTime, nullable=True)  # end of the last lease, for Classes/rollups.py
     created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
 
     # Relationship with users
@@ -25,3 +46,69 @@ class Apartment(db.Model):
 
     def __repr__(self):
         return f'<Apartment {self.unit_number} at {self.location}>'
+
+    @validates('status')
+    def stamp_status_change(self, key, value):
+        if value != self.status:
+            self.status_changed_at = datetime.utcnow()
+        return value
+
+    @validates('map_location')
+    def sync_coordinates(self, key, value):
+        """Keep latitude/longitude/geo_cell in step with map_location."""
+        coordinates = parse_coordinates(value)
+        if coordinates:
+            self.latitude, self.longitude = coordinates
+            self.geo_cell = grid_cell(*coordinates)
+        else:
+            self.latitude = self.longitude = self.geo_cell = None
+        return value
+
+
+APARTMENT_PHOTOS = MediaSet(Apartment, 'photos', 'photo_variants')
+APARTMENT_VIDEO = MediaSet(Apartment, 'video', None)
+
+_owner_contact = USER_FIELDS.plan(USER_CONTACT)
+
+
+def _photo_urls(default_width):
+    def urls(a):
+        width = requested_width(default_width)
+        return [media_url(pick_variant(p, a.photo_variants, width)) for p in a.photos] if a.photos else []
+    return urls
+
+
+# Named shapes of an apartment in API responses
+APARTMENT_CARD = (
+    'id', 'owner_id', 'location', 'price', 'city', 'unit_number', 'area', 'number_of_rooms',
+    'type', 'description', 'photos', 'video', 'parking_availability', 'status', 'created_at', 'owner'
+)
+APARTMENT_DETAIL = tuple(f for f in APARTMENT_CARD if f != 'photos') + ('full_photos', 'map_location')
+APARTMENT_OWNED = (
+    'id', 'location', 'unit_number', 'area', 'number_of_rooms', 'type', 'description',
+    'photos', 'status', 'created_at'
+)
+
+APARTMENT_FIELDS = FieldSet(Apartment, {
+    'id': Field('id'),
+    'owner_id': Field('owner_id'),
+    'location': Field('location'),
+    'price': Field('price'),
+    'city': Field('city'),
+    'unit_number': Field('unit_number'),
+    'area': Field('area'),
+    'number_of_rooms': Field('number_of_rooms'),
+    'type': Field('type'),
+    'description': Field('description'),
+    # Listings get the card-size variant, the detail page the full-size one,
+    # unless the client asks for the smallest one fitting ?photo_width=
+    'photos': Field(_photo_urls(VARIANTS['card']), ['photos', 'photo_variants']),
+    'full_photos': Field(_photo_urls(VARIANTS['full']), ['photos', 'photo_variants'], key='photos'),
+    'video': Field(lambda a: media_url(a.video), ['video']),
+    'parking_availability': Field(lambda a: bool(a.parking_availability), ['parking_availability']),
+    'map_location': Field('map_location'),
+    'status': Field('status'),
+    'created_at': Field('created_at'),
+    'owner': Field(lambda a: _owner_contact(a.owner) if a.owner else None,
+                   ['owner_id'], 'owner', USER_CONTACT),
+}, default=APARTMENT_CARD, always_columns=('id', 'created_at'))  # created_at/id drive the keyset cursor
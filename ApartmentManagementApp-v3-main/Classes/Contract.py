@@ -1,7 +1,12 @@
 from Classes.config import db
+from Classes.serializers import Field, FieldSet
 
 class Contract(db.Model):
     __tablename__ = 'contracts'
+    __table_args__ = (
+        # Lease lookup of the rent payment generator (Classes/billing.py)
+        db.Index('ix_contracts_apartment_id_buyer_id', 'apartment_id', 'buyer_id'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     apartment_id = db.Column(db.BigInteger, db.ForeignKey('apartments.id'), nullable=False)
@@ -23,18 +28,30 @@ class Contract(db.Model):
         return f'<Contract {self.id} - {self.contract_type} for apartment {self.apartment_id}>'
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'apartment_id': self.apartment_id,
-            'apartment_location': self.apartment.location if self.apartment else None,
-            'buyer_id': self.buyer_id,
-            'buyer_name': self.buyer.full_name if self.buyer else None,
-            'owner_id': self.owner_id,
-            'owner_name': self.owner.full_name if self.owner else None,
-            'contract_type': self.contract_type,
-            'contract_details': self.contract_details,
-            'signed_by_buyer': self.signed_by_buyer,
-            'signed_by_owner': self.signed_by_owner,
-            'created_at': self.created_at,
-            'finalized_at': self.finalized_at
-        }
+        return CONTRACT_FIELDS.serialize(self, tuple(CONTRACT_FIELDS.fields))
+
+
+# Listings leave out the contract text
+CONTRACT_LIST = (
+    'id', 'apartment_id', 'apartment_location', 'buyer_id', 'buyer_name', 'owner_id', 'owner_name',
+    'contract_type', 'signed_by_buyer', 'signed_by_owner', 'created_at', 'finalized_at'
+)
+
+CONTRACT_FIELDS = FieldSet(Contract, {
+    'id': Field('id'),
+    'apartment_id': Field('apartment_id'),
+    'apartment_location': Field(lambda c: c.apartment.location if c.apartment else None,
+                                ['apartment_id'], 'apartment', ['location']),
+    'buyer_id': Field('buyer_id'),
+    'buyer_name': Field(lambda c: c.buyer.full_name if c.buyer else None,
+                        ['buyer_id'], 'buyer', ['full_name']),
+    'owner_id': Field('owner_id'),
+    'owner_name': Field(lambda c: c.owner.full_name if c.owner else None,
+                        ['owner_id'], 'owner', ['full_name']),
+    'contract_type': Field('contract_type'),
+    'contract_details': Field('contract_details'),
+    'signed_by_buyer': Field('signed_by_buyer'),
+    'signed_by_owner': Field('signed_by_owner'),
+    'created_at': Field('created_at'),
+    'finalized_at': Field('finalized_at'),
+}, default=CONTRACT_LIST)
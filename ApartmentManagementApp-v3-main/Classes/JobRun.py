@@ -0,0 +1,18 @@
+from Classes.config import db
+
+class JobRun(db.Model):
+    """One run of a batch job (flask mark-overdue, ...) and how many rows it changed."""
+    __tablename__ = 'job_runs'
+    __table_args__ = (
+        db.Index('ix_job_runs_name_started_at', 'name', 'started_at'),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    name = db.Column(db.String(64), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=False)
+    rows_changed = db.Column(db.Integer, nullable=False, default=0)
+    details = db.Column(db.JSON, nullable=True)  # per-table counts
+
+    def __repr__(self):
+        return f'<JobRun {self.name} {self.started_at} rows={self.rows_changed}>'
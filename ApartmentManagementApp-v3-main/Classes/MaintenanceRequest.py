@@ -1,6 +1,8 @@
 from sqlalchemy.orm import joinedload
-from sqlalchemy import func
+from sqlalchemy import func, inspect
 from Classes.config import db
+from Classes.media import VARIANTS, MediaSet, pick_variant, requested_width, upload_web_path
+from Classes.serializers import Field, FieldSet, media_url
 from datetime import datetime
 import json
 import logging
@@ -9,6 +11,16 @@ logger = logging.getLogger(__name__)
 
 class MaintenanceRequest(db.Model):
     __tablename__ = 'maintenance_requests'
+    __table_args__ = (
+        # Listing filters (see get_maintenance_requests), each ending in the
+        # request_date keyset sort so a page is one index range scan
+        db.Index('ix_maintenance_requests_user_status_date', 'user_id', 'status', 'request_date'),
+        db.Index('ix_maintenance_requests_technician_status_date', 'technician_id', 'status', 'request_date'),
+        db.Index('ix_maintenance_requests_status_date', 'status', 'request_date'),
+        db.Index('ix_maintenance_requests_date_id', 'request_date', 'id'),
+        db.Index('ft_maintenance_requests_description', 'description',
+                 mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     apartment_id = db.Column(db.BigInteger, db.ForeignKey('apartments.id'), nullable=True)
@@ -17,6 +29,7 @@ class MaintenanceRequest(db.Model):
     problem_type = db.Column(db.String(255), nullable=True)
     description = db.Column(db.Text, nullable=False)
     images = db.Column(db.JSON, nullable=True)
+    image_variants = db.Column(db.JSON, nullable=True)  # resized copies of images, see Classes/media.py
 
     status = db.Column(
         db.Enum('Pending', 'Pending Confirmation', 'Approved', 'In Progress',
@@ -38,23 +51,24 @@ class MaintenanceRequest(db.Model):
     cost_confirmed = db.Column(db.Boolean, default=False)
     confirmation_date = db.Column(db.DateTime, nullable=True)
 
-    # Relationships
+    # Relationships. Loaded on first access; queries that serialize them
+    # opt into a JOIN with load_profile('detail')
     technician = db.relationship(
         'User',
         foreign_keys=[technician_id],
         backref='assigned_requests',
-        lazy='joined'
+        lazy='select'
     )
     user = db.relationship(
         'User',
         foreign_keys=[user_id],
         backref='maintenance_requests',
-        lazy='joined'
+        lazy='select'
     )
     apartment = db.relationship(
         'Apartment',
         backref='maintenance_requests',
-        lazy='joined'
+        lazy='select'
     )
 
     def __repr__(self):
@@ -99,68 +113,30 @@ class MaintenanceRequest(db.Model):
         db.session.commit()
         return self
 
-    def to_dict(self, include_related=True):
-        try:
-            image_list = json.loads(self.images) if isinstance(self.images, str) else self.images
-            image_list = image_list if isinstance(image_list, list) else []
-        except Exception:
-            image_list = []
-
-        base_dict = {
-            'id': self.id,
-            'apartment_id': self.apartment_id,
-            'user_id': self.user_id,
-            'technician_id': self.technician_id,
-            'problem_type': self.problem_type,
-            'description': self.description,
-            'status': self.status,
-            'request_date': self.request_date.isoformat() if self.request_date else None,
-            'scheduled_date': self.scheduled_date.isoformat() if self.scheduled_date else None,
-            'proposed_cost': float(self.proposed_cost) if self.proposed_cost else None,
-            'proposed_duration': self.proposed_duration,
-            'cost_confirmed': self.cost_confirmed,
-            'confirmation_date': self.confirmation_date.isoformat() if self.confirmation_date else None,
-            'response': self.response,
-            'images': [f"http://localhost:5000/static/{img.lstrip('/')}" for img in image_list] if image_list else []
-        }
-
-        if include_related:
-            try:
-                base_dict['technician'] = {
-                    'id': self.technician.id,
-                    'name': self.technician.full_name,
-                    'email': self.technician.email,
-                    'phone': self.technician.phone_number,
-                    'role': self.technician.role
-                } if self.technician else None
-            except Exception as e:
-                logger.warning(f"Technician relation error: {e}")
-                base_dict['technician'] = None
-
-            try:
-                base_dict['user'] = {
-                    'id': self.user.id,
-                    'name': self.user.full_name,
-                    'email': self.user.email,
-                    'phone': self.user.phone_number,
-                    'role': self.user.role
-                } if self.user else None
-            except Exception as e:
-                logger.warning(f"User relation error: {e}")
-                base_dict['user'] = None
-
-            try:
-                base_dict['apartment'] = {
-                    'id': self.apartment.id,
-                    'unit_number': self.apartment.unit_number,
-                    'location': self.apartment.location,
-                    'type': self.apartment.type
-                } if self.apartment else None
-            except Exception as e:
-                logger.warning(f"Apartment relation error: {e}")
-                base_dict['apartment'] = None
-
-        return base_dict
+    def to_dict(self, include_related=True, fields=None, profile=None):
+        """
+        Serialize the request; `fields` limits the output to those keys.
+
+        With a loader `profile` ('summary' or 'detail') the output is that
+        profile's fields, and relationships the query did not load are left
+        out instead of being lazy-loaded one row at a time.
+        """
+        if profile is not None:
+            unloaded = inspect(self).unloaded
+            fields = {name for name in MAINTENANCE_PROFILES[profile]
+                      if name not in RELATED_FIELDS or name not in unloaded}
+        if not include_related:
+            fields = set(fields or MAINTENANCE_REQUEST_FIELDS.fields) - RELATED_FIELDS
+        return MAINTENANCE_REQUEST_FIELDS.serialize(self, fields)
+
+    @staticmethod
+    def load_profile(profile):
+        """
+        Query options for a loader profile: 'summary' SELECTs only the
+        request's own list columns, 'detail' every column plus the user,
+        technician and apartment in the same SELECT.
+        """
+        return MAINTENANCE_REQUEST_FIELDS.load_options(MAINTENANCE_PROFILES[profile])
 
     @classmethod
     def get_with_relations(cls, request_id):
@@ -179,10 +155,7 @@ class MaintenanceRequest(db.Model):
     def get_by_status(cls, status):
         return (
             db.session.query(cls)
-            .options(
-                joinedload(cls.user),
-                joinedload(cls.apartment)
-            )
+            .options(*cls.load_profile('detail'))
             .filter_by(status=status)
             .all()
         )
@@ -195,12 +168,97 @@ class MaintenanceRequest(db.Model):
     def get_technician_requests(cls, technician_id, status=None):
         query = (
             db.session.query(cls)
-            .options(
-                joinedload(cls.user),
-                joinedload(cls.apartment)
-            )
+            .options(*cls.load_profile('detail'))
             .filter_by(technician_id=technician_id)
         )
         if status:
             query = query.filter_by(status=status)
         return query.all()
+
+
+MAINTENANCE_IMAGES = MediaSet(MaintenanceRequest, 'images', 'image_variants', relative=True)
+
+
+def _image_urls(request):
+    try:
+        image_list = json.loads(request.images) if isinstance(request.images, str) else request.images
+        image_list = image_list if isinstance(image_list, list) else []
+    except Exception:
+        image_list = []
+    urls = []
+    width = requested_width(VARIANTS['card'])
+    for img in image_list:
+        variant = pick_variant(img, request.image_variants, width)
+        urls.append(media_url(upload_web_path(variant) or variant))
+    return urls
+
+
+def _person(relation):
+    def build(request):
+        try:
+            person = getattr(request, relation)
+            return {
+                'id': person.id,
+                'name': person.full_name,
+                'email': person.email,
+                'phone': person.phone_number,
+                'role': person.role
+            } if person else None
+        except Exception as e:
+            logger.warning(f"{relation.title()} relation error: {e}")
+            return None
+    return build
+
+
+def _apartment(request):
+    try:
+        return {
+            'id': request.apartment.id,
+            'unit_number': request.apartment.unit_number,
+            'location': request.apartment.location,
+            'type': request.apartment.type
+        } if request.apartment else None
+    except Exception as e:
+        logger.warning(f"Apartment relation error: {e}")
+        return None
+
+
+def _isoformat(column):
+    return lambda r: getattr(r, column).isoformat() if getattr(r, column) else None
+
+
+PERSON_COLUMNS = ['id', 'full_name', 'email', 'phone_number', 'role']
+RELATED_FIELDS = {'technician', 'user', 'apartment'}
+
+MAINTENANCE_REQUEST_FIELDS = FieldSet(MaintenanceRequest, {
+    'id': Field(lambda r: r.id, ['id']),
+    'apartment_id': Field(lambda r: r.apartment_id, ['apartment_id']),
+    'user_id': Field(lambda r: r.user_id, ['user_id']),
+    'technician_id': Field(lambda r: r.technician_id, ['technician_id']),
+    'problem_type': Field(lambda r: r.problem_type, ['problem_type']),
+    'description': Field(lambda r: r.description, ['description']),
+    'status': Field(lambda r: r.status, ['status']),
+    'request_date': Field(_isoformat('request_date'), ['request_date']),
+    'scheduled_date': Field(_isoformat('scheduled_date'), ['scheduled_date']),
+    'proposed_cost': Field(lambda r: float(r.proposed_cost) if r.proposed_cost else None, ['proposed_cost']),
+    'proposed_duration': Field(lambda r: r.proposed_duration, ['proposed_duration']),
+    'cost_confirmed': Field(lambda r: r.cost_confirmed, ['cost_confirmed']),
+    'confirmation_date': Field(_isoformat('confirmation_date'), ['confirmation_date']),
+    'response': Field(lambda r: r.response, ['response']),
+    'images': Field(_image_urls, ['images', 'image_variants']),
+    'technician': Field(_person('technician'), ['technician_id'], 'technician', PERSON_COLUMNS),
+    'user': Field(_person('user'), ['user_id'], 'user', PERSON_COLUMNS),
+    'apartment': Field(_apartment, ['apartment_id'], 'apartment', ['id', 'unit_number', 'location', 'type']),
+})
+
+# Loader profiles: field shapes routes opt into with load_profile() and
+# to_dict(profile=...)
+MAINTENANCE_SUMMARY = (
+    'id', 'apartment_id', 'user_id', 'technician_id', 'problem_type', 'description', 'status',
+    'request_date', 'scheduled_date', 'proposed_cost', 'cost_confirmed'
+)
+MAINTENANCE_DETAIL = tuple(MAINTENANCE_REQUEST_FIELDS.fields)
+MAINTENANCE_PROFILES = {
+    'summary': MAINTENANCE_SUMMARY,
+    'detail': MAINTENANCE_DETAIL,
+}
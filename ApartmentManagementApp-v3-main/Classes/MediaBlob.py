@@ -0,0 +1,14 @@
+from Classes.config import db
+
+class MediaBlob(db.Model):
+    """One content-addressed upload file, shared by every row that references its path."""
+    __tablename__ = 'media_blobs'
+
+    path = db.Column(db.String(255), primary_key=True)  # '/static/uploads/blobs/ab/<sha256>.jpg'
+    sha256 = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f'<MediaBlob {self.path} refs={self.ref_count}>'
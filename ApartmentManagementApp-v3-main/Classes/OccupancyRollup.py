@@ -0,0 +1,19 @@
+from Classes.config import db
+
+class OccupancyRollup(db.Model):
+    """Days an apartment was listed and rented out per month, see Classes/rollups.py."""
+    __tablename__ = 'occupancy_rollups'
+    __table_args__ = (
+        db.Index('ix_occupancy_rollups_owner_id_month', 'owner_id', 'month'),
+        db.Index('ix_occupancy_rollups_city_month', 'city', 'month'),
+    )
+
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    owner_id = db.Column(db.BigInteger, primary_key=True)
+    apartment_id = db.Column(db.BigInteger, primary_key=True)
+    city = db.Column(db.String(255), nullable=False)
+    listed_days = db.Column(db.Integer, nullable=False, default=0)
+    occupied_days = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<OccupancyRollup {self.month} apt={self.apartment_id} {self.occupied_days}/{self.listed_days}>'
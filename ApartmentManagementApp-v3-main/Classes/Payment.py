@@ -2,13 +2,20 @@ from Classes.config import db
 
 class Payment(db.Model):
     __tablename__ = 'payments'
+    __table_args__ = (
+        # Due / overdue / completed buckets of the payments dashboard
+        db.Index('ix_payments_status_due_date', 'status', 'due_date'),
+        # One payment per transaction and due date, so rent generation reruns are no-ops.
+        # Also serves lookups by transaction_id
+        db.UniqueConstraint('transaction_id', 'due_date', name='uq_payments_transaction_due_date'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     transaction_id = db.Column(db.BigInteger)
     amount = db.Column(db.Numeric(12, 2))
     due_date = db.Column(db.DateTime)
     paid_date = db.Column(db.DateTime)
-    status = db.Column(db.Enum('Pending', 'Completed'))
+    status = db.Column(db.Enum('Pending', 'Completed', 'Overdue'))  # Overdue is set by: flask mark-overdue
 
     def __repr__(self):
         return f'<Payment {self.id}>'
@@ -0,0 +1,20 @@
+from Classes.config import db
+
+class RevenueRollup(db.Model):
+    """Completed transaction revenue per month, apartment and transaction type, see Classes/rollups.py."""
+    __tablename__ = 'revenue_rollups'
+    __table_args__ = (
+        db.Index('ix_revenue_rollups_owner_id_month', 'owner_id', 'month'),
+        db.Index('ix_revenue_rollups_city_month', 'city', 'month'),
+    )
+
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    owner_id = db.Column(db.BigInteger, primary_key=True)
+    apartment_id = db.Column(db.BigInteger, primary_key=True)
+    transaction_type = db.Column(db.Enum('Rent', 'Sale', 'Maintenance'), primary_key=True)
+    city = db.Column(db.String(255), nullable=False)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    transactions = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<RevenueRollup {self.month} apt={self.apartment_id} {self.transaction_type}>'
@@ -7,6 +7,10 @@ from sqlalchemy import Enum, BigInteger, DateTime, Text, ForeignKey
 
 class TechnicianSchedule(db.Model):  # type: ignore
     __tablename__ = 'technician_schedule'
+    __table_args__ = (
+        # Availability check in get_technicians: upcoming 'Scheduled' rows per technician
+        db.Index('ix_technician_schedule_technician_status_date', 'technician_id', 'status', 'scheduled_date'),
+    )
     
     id = db.Column(BigInteger, primary_key=True)
     technician_id = db.Column(BigInteger, ForeignKey('users.id'))
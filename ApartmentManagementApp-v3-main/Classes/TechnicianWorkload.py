@@ -0,0 +1,29 @@
+from Classes.config import db
+
+class TechnicianWorkload(db.Model):
+    """
+    Per-technician maintenance request counters, kept in step with
+    maintenance_requests by Classes/workload.py. `total` counts every
+    assigned request except rejected ones, like get_technician_stats did.
+    """
+    __tablename__ = 'technician_workloads'
+
+    technician_id = db.Column(db.BigInteger, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    pending = db.Column(db.Integer, nullable=False, default=0)
+    in_progress = db.Column(db.Integer, nullable=False, default=0)
+    resolved = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'pending': self.pending,
+            'in_progress': self.in_progress,
+            'resolved': self.resolved,
+            'completed': self.resolved,  # name used by get_technician_stats
+            'rejected': self.rejected
+        }
+
+    def __repr__(self):
+        return f'<TechnicianWorkload {self.technician_id} total={self.total}>'
@@ -3,6 +3,12 @@ from datetime import datetime
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Latest transaction of an apartment (its current buyer/tenant)
+        db.Index('ix_transactions_apartment_id_created_at', 'apartment_id', 'created_at'),
+        # Ledger export order (and its date range)
+        db.Index('ix_transactions_created_at_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.BigInteger, primary_key=True)
     apartment_id = db.Column(db.BigInteger, db.ForeignKey('apartments.id'))
@@ -1,4 +1,5 @@
 from Classes.config import db  # Import db from config.py
+from Classes.serializers import Field, FieldSet
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -18,9 +19,22 @@ class User(db.Model):
         return f'<User {self.full_name}>'
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'full_name': self.full_name,
-            'email': self.email,
-            'role' : self.role
-        }
\ No newline at end of file
+        return USER_FIELDS.serialize(self, USER_SUMMARY)
+
+
+# Named shapes of a user in API responses
+USER_SUMMARY = ('id', 'full_name', 'email', 'role')
+USER_CONTACT = ('id', 'full_name', 'email', 'phone_number')
+USER_PROFILE = ('id', 'full_name', 'email', 'phone_number', 'job', 'facebook_link', 'is_verified', 'created_at')
+
+USER_FIELDS = FieldSet(User, {
+    'id': Field('id'),
+    'full_name': Field('full_name'),
+    'email': Field('email'),
+    'phone_number': Field('phone_number'),
+    'role': Field('role'),
+    'job': Field('job'),
+    'facebook_link': Field('facebook_link'),
+    'is_verified': Field('is_verified'),
+    'created_at': Field('created_at'),
+}, default=USER_SUMMARY)
@@ -0,0 +1,185 @@
+# billing.py
+import calendar
+import logging
+from datetime import datetime
+from sqlalchemy import and_, insert, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import aliased
+from Classes.config import db
+from Classes.Apartment import Apartment
+from Classes.Contract import Contract
+from Classes.JobRun import JobRun
+from Classes.Payment import Payment
+from Classes.Transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+RENTAL_CONTRACT_TYPES = ('Rent', 'Lease')
+
+
+def record_run(name, started_at, details):
+    """Store a JobRun with the per-table row counts in `details`; returns it."""
+    run = JobRun(
+        name=name,
+        started_at=started_at,
+        finished_at=datetime.utcnow(),
+        rows_changed=sum(details.values()),
+        details=details
+    )
+    db.session.add(run)
+    db.session.commit()
+    logger.info(f"{name}: {details}")
+    return run
+
+
+def _update_in_chunks(table, id_query, values, condition, chunk_size):
+    """
+    UPDATE `table` SET `values` for the ids `id_query` selects, chunk_size
+    rows per statement and transaction. The query must stop matching rows
+    once updated, so every chunk starts from the front of the index range
+    and a rerun finds nothing left to do. Returns the number of rows changed.
+    """
+    changed = 0
+    while True:
+        ids = db.session.execute(id_query.limit(chunk_size)).scalars().all()
+        if not ids:
+            return changed
+        result = db.session.execute(
+            update(table).where(table.c.id.in_(ids), condition).values(values)
+        )
+        db.session.commit()
+        changed += result.rowcount
+
+
+def mark_overdue(now=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Set status 'Overdue' on pending payments whose due date has passed, and
+    on pending transactions that have an overdue payment. Rows are changed
+    with bulk UPDATEs driven by the payments (status, due_date) index, never
+    loaded as objects. Idempotent; returns the JobRun recording the counts.
+    """
+    started_at = datetime.utcnow()
+    now = now or started_at
+    payments = Payment.__table__
+    transactions = Transaction.__table__
+
+    past_due = (payments.c.status == 'Pending') & (payments.c.due_date < now)
+    payments_changed = _update_in_chunks(
+        payments,
+        select(payments.c.id).where(past_due).order_by(payments.c.due_date),
+        {'status': 'Overdue'},
+        past_due,
+        chunk_size
+    )
+
+    pending = transactions.c.status == 'Pending'
+    transactions_changed = _update_in_chunks(
+        transactions,
+        select(transactions.c.id).distinct()
+        .join(payments, payments.c.transaction_id == transactions.c.id)
+        .where(payments.c.status == 'Overdue', pending),
+        {'status': 'Overdue'},
+        pending,
+        chunk_size
+    )
+
+    return record_run('mark-overdue', started_at, {
+        'payments': payments_changed,
+        'transactions': transactions_changed
+    })
+
+
+###Recurring rent
+def billing_period(value=None):
+    """First day of a 'YYYY-MM' billing period (the current month by default)."""
+    if not value:
+        return datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    try:
+        return datetime.strptime(value, '%Y-%m')
+    except ValueError:
+        raise ValueError(f"Invalid billing period: {value} (expected YYYY-MM)")
+
+
+def next_period(period):
+    return period.replace(year=period.year + period.month // 12, month=period.month % 12 + 1)
+
+
+def rent_due_date(period, lease_start):
+    """Due date in `period` on the lease's day of month, or the period's last day in shorter months."""
+    last_day = calendar.monthrange(period.year, period.month)[1]
+    return period.replace(day=min(lease_start.day if lease_start else 1, last_day))
+
+
+def active_leases(period):
+    """
+    Rent transactions to bill in `period`: the latest transaction of a
+    Rented apartment, started before the period, with a Rent/Lease contract
+    signed by both parties, and no payment due in the period yet.
+    """
+    newer = aliased(Transaction)
+    period_end = next_period(period)
+    return select(Transaction.id, Transaction.amount, Transaction.created_at) \
+        .join(Apartment, Apartment.id == Transaction.apartment_id) \
+        .where(
+            Transaction.transaction_type == 'Rent',
+            Transaction.created_at < period,
+            Apartment.status == 'Rented',
+            ~select(newer.id).where(
+                newer.apartment_id == Transaction.apartment_id,
+                tuple_(newer.created_at, newer.id) > tuple_(Transaction.created_at, Transaction.id)
+            ).exists(),
+            select(Contract.id).where(
+                Contract.apartment_id == Transaction.apartment_id,
+                Contract.buyer_id == Transaction.user_id,
+                Contract.contract_type.in_(RENTAL_CONTRACT_TYPES),
+                Contract.signed_by_buyer == True,
+                Contract.signed_by_owner == True
+            ).exists(),
+            ~select(Payment.id).where(
+                Payment.transaction_id == Transaction.id,
+                and_(Payment.due_date >= period, Payment.due_date < period_end)
+            ).exists()
+        )
+
+
+def _insert_ignoring_duplicates(rows):
+    """
+    INSERT a batch of payments, skipping (transaction_id, due_date) pairs
+    already present. The statement is compiled once and run as an
+    executemany, which PyMySQL sends as multi-row INSERT ... VALUES.
+    """
+    dialect = db.session.connection().dialect.name
+    if dialect == 'sqlite':
+        statement = sqlite_insert(Payment.__table__).on_conflict_do_nothing()
+    else:
+        statement = insert(Payment.__table__)
+        if dialect == 'mysql':
+            statement = statement.prefix_with('IGNORE')
+    return db.session.execute(statement, rows).rowcount
+
+
+def generate_rent_payments(period, batch_size=DEFAULT_CHUNK_SIZE):
+    """
+    Create the pending rent payment of every active lease for `period`.
+    The leases come from one SELECT (see active_leases) and are inserted
+    batch_size rows per statement and transaction. Leases already billed
+    for the period are skipped, so reruns insert nothing. Returns the
+    JobRun recording the number of payments created.
+    """
+    started_at = datetime.utcnow()
+    leases = db.session.execute(active_leases(period).order_by(Transaction.id)).all()
+    created = 0
+    for start in range(0, len(leases), batch_size):
+        created += _insert_ignoring_duplicates([
+            {
+                'transaction_id': lease.id,
+                'amount': lease.amount,
+                'due_date': rent_due_date(period, lease.created_at),
+                'status': 'Pending'
+            }
+            for lease in leases[start:start + batch_size]
+        ])
+        db.session.commit()
+
+    return record_run('generate-rent-payments', started_at, {'payments': created})
@@ -0,0 +1,179 @@
+# bulk_import.py
+import csv
+import io
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import exc, insert
+from Classes.config import db
+from Classes.Apartment import Apartment
+from Classes.User import User
+from Classes.geo import grid_cell, parse_coordinates
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 500
+APARTMENT_TYPES = set(Apartment.type.type.enums)
+APARTMENT_STATUSES = set(Apartment.status.type.enums)
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+
+
+class ImportFileError(ValueError):
+    """The file could not be read to the end; `inserted` rows before that point were committed."""
+    def __init__(self, message, inserted, errors):
+        super().__init__(message)
+        self.inserted = inserted
+        self.errors = errors
+
+
+def iter_records(stream, fmt):
+    """Yield (row_number, dict) from an uploaded CSV or NDJSON file without reading it all."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for number, record in enumerate(csv.DictReader(text), start=1):
+            yield number, record
+        return
+
+    for number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f'Invalid JSON: {e}')
+            continue
+        yield number, record if isinstance(record, dict) else ValueError('Each line must be a JSON object')
+
+
+def _required(record, field):
+    value = record.get(field)
+    if value is None or str(value).strip() == '':
+        raise ValueError(f'{field} is required')
+    return value.strip() if isinstance(value, str) else value
+
+
+def validate_apartment_row(record):
+    """Turn one imported record into column values for INSERT. Raises ValueError."""
+    if isinstance(record, Exception):
+        raise record
+
+    raw = {field: _required(record, field) for field in (
+        'owner_id', 'location', 'city', 'unit_number', 'price', 'area', 'number_of_rooms'
+    )}
+    try:
+        values = {
+            'owner_id': int(raw['owner_id']),
+            'location': str(raw['location']),
+            'city': str(raw['city']),
+            'unit_number': str(raw['unit_number']),
+            'price': int(raw['price']),
+            'area': Decimal(str(raw['area'])),
+            'number_of_rooms': int(raw['number_of_rooms']),
+        }
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError('price, area, number_of_rooms and owner_id must be numbers')
+
+    apt_type = _required(record, 'type')
+    if not isinstance(apt_type, str) or apt_type not in APARTMENT_TYPES:
+        raise ValueError(f"type must be one of: {', '.join(sorted(APARTMENT_TYPES))}")
+    values['type'] = apt_type
+
+    status = record.get('status') or 'Available'
+    if not isinstance(status, str) or status not in APARTMENT_STATUSES:
+        raise ValueError(f"status must be one of: {', '.join(sorted(APARTMENT_STATUSES))}")
+    values['status'] = status
+
+    # NDJSON values can be any JSON type; the text columns only take strings
+    for field in ('description', 'video', 'map_location'):
+        if record.get(field) is not None and not isinstance(record[field], str):
+            raise ValueError(f'{field} must be a string')
+    values['description'] = record.get('description') or None
+    values['video'] = record.get('video') or None
+    parking = record.get('parking_availability')
+    values['parking_availability'] = parking if isinstance(parking, bool) else str(parking or '').strip().lower() in TRUE_VALUES
+
+    photos = record.get('photos') or None
+    if isinstance(photos, str):
+        try:
+            photos = json.loads(photos)
+        except ValueError:
+            raise ValueError('photos must be a JSON list')
+    if photos is not None and not isinstance(photos, list):
+        raise ValueError('photos must be a JSON list')
+    values['photos'] = photos
+
+    # Core INSERTs bypass the model validator, so derive coordinates here
+    map_location = record.get('map_location') or None
+    coordinates = parse_coordinates(map_location)
+    values['map_location'] = map_location
+    values['latitude'], values['longitude'] = coordinates if coordinates else (None, None)
+    values['geo_cell'] = grid_cell(*coordinates) if coordinates else None
+
+    return values
+
+
+def _insert_chunk(chunk, errors):
+    """Validate and insert one chunk of (row_number, record) in a single transaction."""
+    valid = []
+    for number, record in chunk:
+        try:
+            valid.append((number, validate_apartment_row(record)))
+        except ValueError as e:
+            errors.append({'row': number, 'error': str(e)})
+
+    owner_ids = {values['owner_id'] for _, values in valid}
+    known_owners = {
+        user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_(owner_ids))
+    } if owner_ids else set()
+
+    rows = []
+    for number, values in valid:
+        if values['owner_id'] in known_owners:
+            rows.append((number, values))
+        else:
+            errors.append({'row': number, 'error': f"owner_id {values['owner_id']} does not exist"})
+
+    if not rows:
+        return 0
+
+    try:
+        db.session.execute(insert(Apartment), [values for _, values in rows])  # one executemany
+        db.session.commit()
+    except exc.SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"Bulk import chunk failed: {str(e)}")
+        errors.extend({'row': number, 'error': 'Database error, chunk rolled back'} for number, _ in rows)
+        return 0
+    return len(rows)
+
+
+def import_apartments(records, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Import (row_number, record) pairs chunk by chunk. Returns (inserted,
+    errors); raises ImportFileError when the file stops decoding part way.
+    """
+    inserted = 0
+    errors = []
+    chunk = []
+    last_row = 0
+    read_error = None
+    try:
+        for item in records:
+            last_row = item[0]
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                inserted += _insert_chunk(chunk, errors)
+                chunk = []
+    except (UnicodeDecodeError, csv.Error) as e:
+        read_error = e
+    if chunk:
+        inserted += _insert_chunk(chunk, errors)
+
+    errors.sort(key=lambda e: e['row'])
+    if read_error is not None:
+        raise ImportFileError(
+            f'Could not read the file after row {last_row}: {read_error}; imported {inserted} apartment(s)',
+            inserted, errors
+        )
+    return inserted, errors
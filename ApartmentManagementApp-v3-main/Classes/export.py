@@ -0,0 +1,71 @@
+# export.py
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+EXPORT_BATCH_SIZE = 1000
+
+
+def json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=json_default)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def stream_rows(query, fmt, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yield an export of a column query (not ORM entities) chunk by chunk.
+
+    The query runs on a server-side cursor and is fetched `batch_size` rows
+    at a time, and each batch is encoded and yielded before the next one is
+    read, so memory stays flat however many rows the query returns.
+    """
+    result = query.execution_options(stream_results=True, yield_per=batch_size)
+    columns = [c['name'] for c in query.column_descriptions]
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for partition in _batches(result, batch_size):
+            for row in partition:
+                writer.writerow([_csv_value(v) for v in row])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        if buffer.tell():
+            yield buffer.getvalue()  # header of an empty export
+        return
+
+    for partition in _batches(result, batch_size):
+        yield ''.join(
+            json.dumps(dict(zip(columns, row)), default=json_default) + '\n'
+            for row in partition
+        )
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,65 @@
+# geo.py
+import math
+import re
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+# Grid used by the apartments.geo_cell index. Cells are CELL_DEGREES wide and
+# numbered row-major, so the cells of one row of a bounding box form a
+# contiguous id range and a radius query becomes a few BETWEEN ranges.
+CELL_DEGREES = 0.01
+GRID_COLUMNS = int(360 / CELL_DEGREES)
+
+_NUMBER = r'(-?\d{1,3}\.\d+)'
+COORDINATE_PATTERNS = [
+    (re.compile(r'@' + _NUMBER + r',' + _NUMBER), False),            # maps URL .../@31.90,35.20,15z
+    (re.compile(r'!3d' + _NUMBER + r'!4d' + _NUMBER), False),        # place URL ...!3d31.90!4d35.20
+    (re.compile(r'!2d' + _NUMBER + r'!3d' + _NUMBER), True),         # embed URL ...!2d35.20!3d31.90
+    (re.compile(_NUMBER + r'\s*,\s*' + _NUMBER), False),             # "31.90, 35.20", ?q=31.90,35.20
+]
+
+
+def parse_coordinates(text):
+    """Extract (latitude, longitude) from a map_location string, or None."""
+    if not text:
+        return None
+    for pattern, lon_first in COORDINATE_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        first, second = float(match.group(1)), float(match.group(2))
+        lat, lon = (second, first) if lon_first else (first, second)
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            return lat, lon
+    return None
+
+
+def grid_cell(lat, lon):
+    row = int((lat + 90) / CELL_DEGREES)
+    column = min(int((lon + 180) / CELL_DEGREES), GRID_COLUMNS - 1)
+    return row * GRID_COLUMNS + column
+
+
+def cell_ranges(lat, lon, radius_km):
+    """[(low, high)] geo_cell ranges covering the bounding box of the circle."""
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+
+    low_row = int((max(lat - dlat, -90) + 90) / CELL_DEGREES)
+    high_row = int((min(lat + dlat, 90) + 90) / CELL_DEGREES)
+    low_column = int((max(lon - dlon, -180) + 180) / CELL_DEGREES)
+    high_column = min(int((min(lon + dlon, 180) + 180) / CELL_DEGREES), GRID_COLUMNS - 1)
+
+    return [
+        (row * GRID_COLUMNS + low_column, row * GRID_COLUMNS + high_column)
+        for row in range(low_row, high_row + 1)
+    ]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
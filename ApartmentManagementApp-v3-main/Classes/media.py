@@ -0,0 +1,410 @@
+# media.py
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from flask import has_request_context, request
+from sqlalchemy import exc, update
+from werkzeug.utils import secure_filename
+from Classes.config import db
+from Classes.MediaBlob import MediaBlob
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional; without Pillow uploads are served as-is
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FOLDER = 'static/uploads'
+BLOB_FOLDER = f'{UPLOAD_FOLDER}/blobs'
+VARIANT_FOLDER = f'{UPLOAD_FOLDER}/variants'
+TMP_FOLDER = f'{UPLOAD_FOLDER}/.tmp'
+COPY_CHUNK_SIZE = 64 * 1024
+
+# Derivatives rendered for every uploaded photo, smallest first: name -> max width
+VARIANTS = {
+    'thumb': 160,
+    'card': 480,
+    'full': 1600,
+}
+VARIANT_FORMAT = 'WEBP'
+VARIANT_QUALITY = 80
+
+# A column of upload paths (a JSON list, or a single path) and the JSON column
+# holding their variants, as {path: {'thumb': url, 'card': url, 'full': url}},
+# or None for media without variants. `relative` sets store paths relative to
+# the uploads folder instead of as '/static/uploads/...'.
+MediaSet = namedtuple('MediaSet', 'model paths variants relative', defaults=(False,))
+
+
+def upload_web_path(path):
+    """
+    Stored upload path as a '/static/uploads/...' web path, or None when it
+    does not point into the uploads folder (external links, imported URLs).
+    Apartment photos are stored as '/static/uploads/x.jpg', maintenance
+    images relative to the uploads folder ('maintenance/x.jpg').
+    """
+    if not path or '://' in path:
+        return None
+    path = path.replace('\\', '/').lstrip('/')
+    if not path.startswith(UPLOAD_FOLDER + '/'):
+        path = f'{UPLOAD_FOLDER}/{path}'
+    return '/' + path
+
+
+def stored_path(web_path, relative=False):
+    """Inverse of upload_web_path for a MediaSet's path convention."""
+    return web_path[len(f'/{UPLOAD_FOLDER}/'):] if relative else web_path
+
+
+def disk_path(web_path):
+    return os.path.join('.', web_path.lstrip('/'))
+
+
+def variant_paths(path):
+    """Web paths of the variant files rendered for an upload, by variant name."""
+    web_path = upload_web_path(path)
+    stem = os.path.splitext(web_path[len(f'/{UPLOAD_FOLDER}/'):])[0]
+    return {
+        name: f'/{VARIANT_FOLDER}/{stem}.{name}.{VARIANT_FORMAT.lower()}'
+        for name in VARIANTS
+    }
+
+
+def pick_variant(path, variants, width):
+    """
+    URL path of the smallest rendered variant of an upload at least `width`
+    pixels wide (the largest one if none is), falling back to the original.
+    """
+    rendered = (variants or {}).get(path) or {}
+    names = [name for name in VARIANTS if rendered.get(name)]
+    if not names:
+        return path
+    fitting = [name for name in names if VARIANTS[name] >= width]
+    return rendered[fitting[0] if fitting else names[-1]]
+
+
+def requested_width(default):
+    """The ?photo_width= of the current request (in CSS pixels times density), else `default`."""
+    if has_request_context():
+        width = request.args.get('photo_width', type=int)
+        if width and width > 0:
+            return width
+    return default
+
+
+def render_variants(path):
+    """Write the resized variants of one upload; returns {name: web path} or None."""
+    web_path = upload_web_path(path)
+    if Image is None or web_path is None:
+        return None
+
+    targets = variant_paths(web_path)
+    if is_blob(web_path) and _variants_exist(targets):
+        return targets  # identical bytes were already rendered for another row
+    try:
+        with Image.open(disk_path(web_path)) as original:
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+            urls = {}
+            previous_width = None
+            for name, width in VARIANTS.items():
+                width = min(width, image.width)
+                if width == previous_width:  # original is smaller than this variant; reuse
+                    urls[name] = urls[next(reversed(urls))]
+                    continue
+                height = max(1, round(image.height * width / image.width))
+                target = targets[name]
+                os.makedirs(os.path.dirname(disk_path(target)), exist_ok=True)
+                image.resize((width, height), Image.LANCZOS).save(
+                    disk_path(target), VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4
+                )
+                urls[name] = target
+                previous_width = width
+            return urls
+    except (OSError, ValueError) as e:  # missing file, or a format Pillow cannot decode
+        logger.warning(f"Could not render variants of {path}: {str(e)}")
+        return None
+
+
+###Content-addressed upload storage
+# Uploads are stored once per distinct content, at a path derived from their
+# SHA-256, and media_blobs counts the row references to each path so a file
+# is only deleted when the last row using it lets go.
+def blob_path(digest, extension):
+    return f'/{BLOB_FOLDER}/{digest[:2]}/{digest}{extension}'
+
+
+def is_blob(path):
+    web_path = upload_web_path(path)
+    return bool(web_path) and web_path.startswith(f'/{BLOB_FOLDER}/')
+
+
+def upload_extension(filename):
+    return os.path.splitext(secure_filename(filename or ''))[1].lower()
+
+
+def store_upload(file, extension=None):
+    """
+    Stream an uploaded file to disk while hashing it and return its blob web path.
+
+    The bytes go to a temporary file in chunks; once the digest is known the
+    file is moved to its content path, or dropped when that content is
+    already stored. The caller references the path with retain().
+    """
+    os.makedirs(TMP_FOLDER, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=TMP_FOLDER)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(COPY_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        return store_file(tmp, digest.hexdigest(), size, upload_extension(file.filename) if extension is None else extension)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _lock_blob(web_path, digest, size):
+    """Fetch or create the blob's row, locked until the caller's transaction ends."""
+    blob = MediaBlob.query.filter_by(path=web_path).with_for_update().one_or_none()
+    if blob is None:
+        try:
+            with db.session.begin_nested():
+                blob = MediaBlob(path=web_path, sha256=digest, size=size, ref_count=0)
+                db.session.add(blob)
+        except exc.IntegrityError:  # registered by a concurrent upload of the same bytes
+            blob = MediaBlob.query.filter_by(path=web_path).with_for_update().one()
+    return blob
+
+
+def store_file(tmp, digest, size, extension, keep_source=False):
+    """
+    Move (or copy) an already hashed file into the blob store; returns its web path.
+
+    The blob row is locked before the file is looked at, so a concurrent
+    purge_unreferenced() of the same bytes either finishes first (and this
+    writes the file again) or waits until the caller has retain()ed the
+    path and committed.
+    """
+    web_path = blob_path(digest, extension)
+    _lock_blob(web_path, digest, size)
+
+    target = disk_path(web_path)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if keep_source:
+            shutil.copyfile(tmp, target + '.part')
+            os.replace(target + '.part', target)
+        else:
+            os.replace(tmp, target)
+    else:
+        os.utime(target)  # reused: restart collect_garbage()'s grace period until the row is committed
+    return web_path
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _bump(counts, sign):
+    by_amount = {}
+    for path, count in counts.items():
+        by_amount.setdefault(count, []).append(path)
+    for amount, paths in by_amount.items():
+        db.session.execute(
+            update(MediaBlob)
+            .where(MediaBlob.path.in_(paths))
+            .values(ref_count=MediaBlob.ref_count + sign * amount)
+        )
+
+
+def _blob_counts(paths):
+    return Counter(upload_web_path(p) for p in paths or [] if is_blob(p))
+
+
+def update_references(old_paths, new_paths):
+    """
+    Adjust blob reference counts for a row whose paths changed, in the
+    caller's transaction. Returns the blob paths it stopped referencing;
+    pass them to purge_unreferenced() once the change is committed.
+    """
+    old, new = _blob_counts(old_paths), _blob_counts(new_paths)
+    added, dropped = new - old, old - new
+    _bump(added, 1)
+    _bump(dropped, -1)
+    return set(dropped)
+
+
+def retain(paths):
+    return update_references((), paths)
+
+
+def release(paths):
+    return update_references(paths, ())
+
+
+def recount_references(media_sets):
+    """Recompute every blob's ref_count from the rows of `media_sets`."""
+    counts = Counter()
+    for media_set in media_sets:
+        column = getattr(media_set.model, media_set.paths)
+        rows = db.session.query(column).filter(column.isnot(None)).execution_options(yield_per=1000)
+        for (paths,) in rows:
+            counts.update(_blob_counts(path_list(paths)))
+
+    db.session.execute(update(MediaBlob).values(ref_count=0))
+    _bump(counts, 1)
+    db.session.commit()
+    return counts
+
+
+def remove_upload_files(paths):
+    """Delete upload files and their rendered variants from disk. Returns bytes removed."""
+    removed = 0
+    for path in paths:
+        web_path = upload_web_path(path)
+        if web_path is None:
+            continue
+        for target in [web_path] + sorted(set(variant_paths(web_path).values())):
+            try:
+                size = os.path.getsize(disk_path(target))
+                os.remove(disk_path(target))
+                removed += size
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not delete file {target}: {str(e)}")
+    return removed
+
+
+def purge_unreferenced(paths):
+    """Delete the blobs among `paths` that no row references any more."""
+    if not paths:
+        return 0
+    orphaned = [path for (path,) in db.session.query(MediaBlob.path).filter(
+        MediaBlob.path.in_(paths),
+        MediaBlob.ref_count <= 0
+    ).with_for_update()]
+    if orphaned:
+        MediaBlob.query.filter(MediaBlob.path.in_(orphaned), MediaBlob.ref_count <= 0) \
+            .delete(synchronize_session=False)
+    # Files go while the rows are still locked, so store_file() of the same
+    # bytes waits and then writes a fresh copy
+    removed = remove_upload_files(orphaned)
+    db.session.commit()
+    return removed
+
+
+def _variants_exist(urls):
+    return all(os.path.exists(disk_path(url)) for url in urls.values())
+
+
+def path_list(value):
+    if isinstance(value, str):  # single-path columns such as apartments.video
+        return [value]
+    return value if isinstance(value, list) else []
+
+
+class DerivativePipeline:
+    """
+    Renders photo variants on a background thread pool.
+
+    Upload routes commit the row and then submit() it; a worker renders the
+    variants of any path that lacks them and stores their URLs in the row's
+    variants column, so the request never waits on image processing. The
+    write re-reads the row's current paths, so a job that finishes after a
+    newer edit never brings back variants of removed photos.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self.listeners = []  # callables (model, row_id) run after variants are stored
+        self._app = None
+        self._executor = None
+        self._write_lock = threading.Lock()
+
+    def configure(self, app):
+        self._app = app
+        self.max_workers = app.config.get('MEDIA_WORKERS', self.max_workers)
+
+    @property
+    def enabled(self):
+        return Image is not None
+
+    def submit(self, media_set, row_id):
+        if not self.enabled:
+            return None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='media')
+        return self._executor.submit(self._run, media_set, row_id)
+
+    def _run(self, media_set, row_id):
+        with self._app.app_context():
+            try:
+                return self.process(media_set, row_id)
+            except Exception as e:
+                logger.error(f"Rendering variants of {media_set.model.__name__} {row_id} failed: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def process(self, media_set, row_id):
+        """Render missing variants of one row and store them. Returns the number of uploads rendered."""
+        model = media_set.model
+        paths_column = getattr(model, media_set.paths)
+        variants_column = getattr(model, media_set.variants)
+
+        row = db.session.query(paths_column, variants_column).filter(model.id == row_id).first()
+        db.session.rollback()  # no transaction held open while rendering
+        if row is None:
+            return 0
+        stored = row[1] or {}
+        rendered = {}
+        for path in path_list(row[0]):
+            if path in stored and _variants_exist(stored[path]):
+                continue
+            urls = render_variants(path)
+            if urls:
+                rendered[path] = urls
+
+        with self._write_lock:
+            row = db.session.query(paths_column, variants_column).filter(model.id == row_id).first()
+            if row is None:
+                return 0
+            current = {**(row[1] or {}), **rendered}
+            variants = {path: current[path] for path in path_list(row[0]) if path in current}
+            changed = variants != (row[1] or {})
+            if changed:
+                db.session.execute(update(model).where(model.id == row_id).values({media_set.variants: variants}))
+                db.session.commit()
+            else:
+                db.session.rollback()
+
+        if changed:
+            for listener in self.listeners:
+                listener(model, row_id)
+        return len(rendered)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+derivative_pipeline = DerivativePipeline()
@@ -0,0 +1,68 @@
+# pagination.py
+import base64
+from datetime import datetime
+from sqlalchemy import or_, tuple_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(sort_value, row_id):
+    """Encode the (sort value, id) of the last row of a page into an opaque cursor."""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    elif sort_value is None:
+        sort_value = ''
+    raw = f"{sort_value}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        sort_value, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(sort_value) if sort_value else None, int(row_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def clamp_limit(limit):
+    """Keep a client supplied page size inside [1, MAX_PAGE_SIZE]."""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_page(query, sort_column, id_column, cursor=None, limit=None, nullable=False):
+    """
+    Fetch one page of `query` ordered newest first by (sort_column, id_column).
+
+    Runs a single SELECT with LIMIT limit + 1, so the cost of a page does not
+    depend on how deep into the result set the client is.
+    With `nullable`, rows whose sort value is NULL follow all the others (as
+    MySQL and SQLite sort NULLs in descending order) instead of being skipped.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = clamp_limit(limit)
+    query = query.order_by(sort_column.desc(), id_column.desc())
+
+    if cursor:
+        last_value, last_id = decode_cursor(cursor)
+        if last_value is None:
+            query = query.filter(sort_column.is_(None), id_column < last_id)
+        elif nullable:
+            query = query.filter(or_(
+                tuple_(sort_column, id_column) < tuple_(last_value, last_id), sort_column.is_(None)
+            ))
+        else:
+            query = query.filter(tuple_(sort_column, id_column) < tuple_(last_value, last_id))
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
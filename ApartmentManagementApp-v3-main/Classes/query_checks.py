@@ -0,0 +1,40 @@
+# query_checks.py
+import re
+from Classes.config import db
+
+SQLITE_INDEX_RE = re.compile(r'USING (?:COVERING )?INDEX (\w+)')
+
+
+def explain(query):
+    """
+    Run EXPLAIN for an ORM query on the current database.
+
+    Returns a list of dicts, one per plan row. MySQL gives the classic
+    EXPLAIN columns (table, key, possible_keys, rows, ...); SQLite gives
+    the EXPLAIN QUERY PLAN rows (id, parent, notused, detail).
+    """
+    connection = db.session.connection()
+    dialect = connection.dialect
+    compiled = query.statement.compile(dialect=dialect)
+
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+    result = connection.exec_driver_sql(prefix + str(compiled), params)
+    return [dict(row._mapping) for row in result]
+
+
+def used_indexes(query, table):
+    """Names of the indexes the planner picked for `table` when running `query`."""
+    rows = explain(query)
+    if db.session.connection().dialect.name == 'sqlite':
+        return [
+            match.group(1)
+            for row in rows
+            if table in row['detail']
+            for match in [SQLITE_INDEX_RE.search(row['detail'])]
+            if match
+        ]
+    return [row['key'] for row in rows if row.get('table') == table and row.get('key')]
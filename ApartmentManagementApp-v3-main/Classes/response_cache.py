@@ -0,0 +1,155 @@
+# response_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, make_response, request
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of serialized JSON responses.
+
+    Every entry carries a set of tags ('apartments', 'apartment:12',
+    'user:7', ...). Write routes call invalidate() with the tags they
+    affect, which drops exactly the entries built from that data.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, body, etag, mimetype, tags)
+        self._tag_index = {}           # tag -> set of keys
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a response computed while a write
+        # was committing is not stored as if it were fresh
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def configure(self, app):
+        self.max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', self.max_entries)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', self.ttl)
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[4]:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, mimetype, tags, generation):
+        etag = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            if generation != self._generation:
+                return etag
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, body, etag, mimetype, frozenset(tags))
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+        return etag
+
+    def invalidate(self, *tags):
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._tag_index.get(tag, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tag_index.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'not_modified': self.not_modified,
+                'invalidations': self.invalidations
+            }
+
+
+response_cache = ResponseCache()
+
+
+def normalized_cache_key():
+    """Endpoint + view args + query args sorted, with empty values dropped."""
+    args = tuple(sorted(
+        (k, v.strip()) for k, v in request.args.items(multi=True) if v.strip()
+    ))
+    return (request.endpoint, tuple(sorted(request.view_args.items())), args)
+
+
+def _conditional(body, etag, mimetype):
+    if request.if_none_match.contains(etag):
+        response_cache.not_modified += 1
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def cached_response(tags):
+    """
+    Cache a GET view's 200 responses in response_cache.
+
+    `tags(view_args, payload)` returns the invalidation tags of an entry,
+    where payload is the decoded JSON the view produced. Repeat requests
+    carrying a matching If-None-Match get a 304 without touching the DB.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            key = normalized_cache_key()
+            entry = response_cache.get(key)
+            if entry is not None:
+                _, body, etag, mimetype, _ = entry
+                return _conditional(body, etag, mimetype)
+
+            generation = response_cache.generation
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            body = response.get_data()
+            etag = response_cache.put(key, body, response.mimetype,
+                                      tags(kwargs, response.get_json(silent=True)), generation)
+            return _conditional(body, etag, response.mimetype)
+        return decorated
+    return decorator
@@ -0,0 +1,192 @@
+# resumable.py
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from Classes.media import COPY_CHUNK_SIZE, UPLOAD_FOLDER, hash_file, store_file, upload_extension
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,termination,checksum'
+TUS_CHECKSUM_ALGORITHMS = 'sha256'
+DEFAULT_MAX_UPLOAD_SIZE = 2 * 1024 ** 3  # 2 GB
+UPLOAD_SESSION_TTL = 24 * 3600
+SHA256_HEX = re.compile(r'^[0-9a-fA-F]{64}$')
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_metadata(header):
+    """Decode a tus Upload-Metadata header: 'key base64value,key2 base64value2'."""
+    metadata = {}
+    for pair in (header or '').split(','):
+        parts = pair.strip().split(' ')
+        if not parts[0]:
+            continue
+        try:
+            metadata[parts[0]] = base64.b64decode(parts[1]).decode('utf-8') if len(parts) > 1 else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(f'Upload-Metadata value of {parts[0]} is not valid base64')
+    return metadata
+
+
+def parse_checksum(header):
+    """Decode a tus Upload-Checksum header ('sha256 <base64 digest>') into a hex digest."""
+    algorithm, _, value = (header or '').partition(' ')
+    if algorithm != 'sha256':
+        raise UploadError('Upload-Checksum algorithm must be sha256')
+    try:
+        return base64.b64decode(value).hex()
+    except binascii.Error:
+        raise UploadError('Upload-Checksum digest is not valid base64')
+
+
+class ResumableUploads:
+    """
+    Upload sessions for the tus-style /uploads endpoints.
+
+    A session is a `<id>.part` file that PATCH requests append to, plus a
+    `<id>.json` file with its declared length and metadata. The current
+    offset is the size of the .part file, so a client that lost its
+    connection asks for it with HEAD and continues from there. Request
+    bodies are copied to disk in COPY_CHUNK_SIZE pieces, so memory use does
+    not depend on the file size.
+    """
+
+    def __init__(self, folder=f'{UPLOAD_FOLDER}/.partial', max_size=DEFAULT_MAX_UPLOAD_SIZE):
+        self.folder = folder
+        self.max_size = max_size
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def configure(self, app):
+        self.folder = app.config.get('RESUMABLE_UPLOAD_FOLDER', self.folder)
+        self.max_size = app.config.get('RESUMABLE_UPLOAD_MAX_SIZE', self.max_size)
+
+    def _path(self, upload_id, suffix):
+        if not upload_id.isalnum():
+            raise UploadError('Upload not found', 404)
+        return os.path.join(self.folder, f'{upload_id}.{suffix}')
+
+    def create(self, length, metadata):
+        if length <= 0:
+            raise UploadError('Upload-Length must be a positive integer')
+        if length > self.max_size:
+            raise UploadError(f'Upload-Length exceeds the maximum of {self.max_size} bytes', 413)
+
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self.folder, exist_ok=True)
+        open(self._path(upload_id, 'part'), 'wb').close()
+        with open(self._path(upload_id, 'json'), 'w') as info:
+            json.dump({'length': length, 'metadata': metadata, 'created': time.time()}, info)
+        return upload_id
+
+    def info(self, upload_id):
+        try:
+            with open(self._path(upload_id, 'json')) as info:
+                session = json.load(info)
+            session['offset'] = os.path.getsize(self._path(upload_id, 'part'))
+        except FileNotFoundError:
+            raise UploadError('Upload not found', 404)
+        return session
+
+    def _lock(self, upload_id):
+        with self._locks_guard:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def append(self, upload_id, offset, stream, checksum=None):
+        """Write a PATCH body at `offset`; returns the new offset."""
+        lock = self._lock(upload_id)
+        if not lock.acquire(blocking=False):
+            raise UploadError('Another request is writing to this upload', 409)
+        try:
+            session = self.info(upload_id)
+            if offset != session['offset']:
+                raise UploadError(f"Upload-Offset {offset} does not match the current offset {session['offset']}", 409)
+
+            digest = hashlib.sha256()
+            written = 0
+            with open(self._path(upload_id, 'part'), 'r+b') as part:
+                part.seek(offset)
+                try:
+                    for chunk in iter(lambda: stream.read(COPY_CHUNK_SIZE), b''):
+                        written += len(chunk)
+                        if offset + written > session['length']:
+                            raise UploadError('Chunk goes past the declared Upload-Length', 413)
+                        digest.update(chunk)
+                        part.write(chunk)
+                    if checksum and digest.hexdigest() != checksum:
+                        raise UploadError('Chunk checksum mismatch', 460)
+                except Exception:
+                    # Drop the partial chunk so the client can resend it from `offset`
+                    part.truncate(offset)
+                    raise
+            return offset + written
+        finally:
+            lock.release()
+
+    def finish(self, upload_id, sha256):
+        """Verify a complete upload against its SHA-256 and move it into the blob store."""
+        if not isinstance(sha256, str) or not SHA256_HEX.match(sha256):
+            raise UploadError('sha256 must be a 64 character hex digest')
+        lock = self._lock(upload_id)
+        if not lock.acquire(blocking=False):
+            raise UploadError('Another request is writing to this upload', 409)
+        try:
+            session = self.info(upload_id)
+            if session['offset'] != session['length']:
+                raise UploadError(f"Upload is incomplete ({session['offset']} of {session['length']} bytes)", 409)
+
+            part = self._path(upload_id, 'part')
+            digest, size = hash_file(part)
+            if digest != sha256.lower():
+                raise UploadError('Checksum mismatch; the upload does not match the expected sha256', 460)
+
+            web_path = store_file(part, digest, size, upload_extension(session['metadata'].get('filename')))
+            self._discard(upload_id)
+            return web_path
+        finally:
+            lock.release()
+
+    def _discard(self, upload_id):
+        for suffix in ('part', 'json'):
+            try:
+                os.remove(self._path(upload_id, suffix))
+            except FileNotFoundError:
+                pass
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+
+    def delete(self, upload_id):
+        self.info(upload_id)
+        self._discard(upload_id)
+
+    def expire(self, max_age=UPLOAD_SESSION_TTL):
+        """Remove sessions not finished within `max_age` seconds. Returns the number removed."""
+        if not os.path.isdir(self.folder):
+            return 0
+        cutoff = time.time() - max_age
+        newest = {}  # upload id -> newest mtime of its .part/.json files
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                upload_id, _, suffix = entry.name.partition('.')
+                if suffix in ('part', 'json') and upload_id.isalnum():
+                    newest[upload_id] = max(newest.get(upload_id, 0), entry.stat().st_mtime)
+
+        expired = 0
+        for upload_id, mtime in newest.items():
+            if mtime < cutoff:
+                self._discard(upload_id)
+                expired += 1
+        return expired
+
+
+resumable_uploads = ResumableUploads()
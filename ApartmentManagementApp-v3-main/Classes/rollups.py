@@ -0,0 +1,312 @@
+# rollups.py
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from Classes.config import db
+from Classes.Apartment import Apartment
+from Classes.OccupancyRollup import OccupancyRollup
+from Classes.RevenueRollup import RevenueRollup
+from Classes.Transaction import Transaction
+from Classes.billing import record_run
+
+try:
+    import numpy as np
+except ImportError:  # optional; only rebuild_rollups() needs it
+    np = None
+
+# Occupancy model shared by the incremental updates and the rebuild:
+# a Rent transaction starts a lease on its day, and the lease ends at the
+# apartment's next Rent or Sale transaction. The latest lease of an
+# apartment that is still Rented counts through the end of the current
+# month; one that is no longer Rented ended at status_changed_at. Starting
+# a lease adds the rest of the month and ending one gives it back, so
+# ongoing leases need no daily updates; the rows of a new month are
+# created by: flask rebuild-rollups --since <month>
+REVENUE_STATUS = 'Completed'
+TRANSACTION_TYPES = ('Rent', 'Sale', 'Maintenance')
+LEASE_BOUNDARY_TYPES = ('Rent', 'Sale')
+INSERT_BATCH_SIZE = 5000
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _upsert(table, row, increments):
+    """INSERT `row`, or apply `increments` ({column: expression}) to the existing row with its key."""
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        connection.execute(mysql_insert(table).values(row).on_duplicate_key_update(increments))
+    elif dialect == 'sqlite':
+        connection.execute(sqlite_insert(table).values(row).on_conflict_do_update(
+            index_elements=list(table.primary_key.columns), set_=increments
+        ))
+    else:
+        key = [column == row[column.name] for column in table.primary_key.columns]
+        if connection.execute(update(table).where(*key).values(increments)).rowcount == 0:
+            connection.execute(insert(table).values(row))
+
+
+# Incremental updates, applied in the caller's transaction
+def record_transaction(transaction, apartment):
+    """Add a completed transaction to the revenue rollup of its month."""
+    if transaction.status != REVENUE_STATUS:
+        return
+    table = RevenueRollup.__table__
+    amount = Decimal(str(transaction.amount))
+    _upsert(table, {
+        'month': month_start(transaction.created_at),
+        'owner_id': apartment.owner_id,
+        'apartment_id': apartment.id,
+        'transaction_type': transaction.transaction_type,
+        'city': apartment.city,
+        'revenue': amount,
+        'transactions': 1
+    }, {
+        'revenue': table.c.revenue + amount,
+        'transactions': table.c.transactions + 1
+    })
+
+
+def record_lease_change(apartment, ended, started, when=None):
+    """
+    Update the apartment's occupancy for the current month when a lease
+    ends and/or starts at `when`. Without a row for the month (no rebuild
+    since it began) the row is created with the days of the ended lease
+    that already passed.
+    """
+    if not ended and not started:
+        return
+    day = (when or datetime.utcnow()).date()
+    month = month_start(day)
+    remaining = (next_month(month) - day).days
+    elapsed = (day - month).days
+
+    table = OccupancyRollup.__table__
+    listed_from = max(month, apartment.created_at.date()) if apartment.created_at else month
+    _upsert(table, {
+        'month': month,
+        'owner_id': apartment.owner_id,
+        'apartment_id': apartment.id,
+        'city': apartment.city,
+        'listed_days': (next_month(month) - listed_from).days,
+        'occupied_days': (elapsed if ended else 0) + (remaining if started else 0)
+    }, {
+        'occupied_days': table.c.occupied_days + (remaining if started else 0) - (remaining if ended else 0)
+    })
+
+
+# Rebuild
+def _days(values):
+    return np.array([v.date() if v else None for v in values], dtype='datetime64[D]')
+
+
+def _month_number(months):
+    """datetime64[M] -> year * 12 + month - 1, as used for the month keys below."""
+    return months.astype(np.int64) + 1970 * 12
+
+
+def _month_date(number):
+    return date(int(number) // 12, int(number) % 12 + 1, 1)
+
+
+def rebuild_rollups(since=None, today=None):
+    """
+    Recompute both rollup tables from transactions and apartments, for
+    months from `since` (a date; everything by default) to the current one.
+    Aggregation is vectorized with NumPy: revenue is summed per (month,
+    apartment, type) key with np.unique/np.add.at in integer cents, and
+    lease days are clipped against each month's bounds for all leases at
+    once. Returns the JobRun recording the rows written.
+    """
+    if np is None:
+        raise RuntimeError('Rebuilding rollups requires NumPy (pip install numpy)')
+    started_at = datetime.utcnow()
+    today = today or started_at.date()
+    since = month_start(since) if since else None
+
+    apartments = db.session.execute(select(
+        Apartment.id, Apartment.owner_id, Apartment.city, Apartment.status,
+        Apartment.created_at, Apartment.status_changed_at
+    ).order_by(Apartment.id)).all()
+    transactions = db.session.execute(select(
+        Transaction.apartment_id, Transaction.transaction_type, Transaction.status,
+        Transaction.amount, Transaction.created_at
+    ).where(
+        Transaction.apartment_id.isnot(None), Transaction.created_at.isnot(None)
+    ).order_by(Transaction.apartment_id, Transaction.created_at, Transaction.id)).all()
+
+    for model in (RevenueRollup, OccupancyRollup):
+        statement = delete(model)
+        if since:
+            statement = statement.where(model.month >= since)
+        db.session.execute(statement)
+
+    revenue_rows, occupancy_rows = [], []
+    if apartments:
+        apartment_ids = np.array([a.id for a in apartments], dtype=np.int64)
+        tx_apartment = np.searchsorted(apartment_ids, np.array([t.apartment_id for t in transactions], dtype=np.int64))
+        known = (tx_apartment < len(apartment_ids)) & \
+            (apartment_ids[np.minimum(tx_apartment, len(apartment_ids) - 1)] ==
+             np.array([t.apartment_id for t in transactions], dtype=np.int64))
+        tx_day = _days([t.created_at for t in transactions])
+        tx_type = np.array([TRANSACTION_TYPES.index(t.transaction_type) for t in transactions], dtype=np.int64)
+        first_month = since or min(
+            [a.created_at.date() for a in apartments if a.created_at] + [t.created_at.date() for t in transactions],
+            default=today
+        )
+        months = np.arange(np.datetime64(month_start(first_month), 'M'),
+                           np.datetime64(month_start(today), 'M') + 1)
+
+        revenue_rows = _revenue_rows(apartments, transactions, tx_apartment, tx_day, tx_type, known, since)
+        occupancy_rows = _occupancy_rows(apartments, tx_apartment, tx_day, tx_type, known, months, today)
+
+    # Core executemany of one compiled INSERT; the ORM bulk path costs more than the statements
+    connection = db.session.connection()
+    for model, rows in ((RevenueRollup, revenue_rows), (OccupancyRollup, occupancy_rows)):
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            connection.execute(insert(model.__table__), rows[start:start + INSERT_BATCH_SIZE])
+    db.session.commit()
+
+    return record_run('rebuild-rollups', started_at, {
+        'revenue_rollups': len(revenue_rows),
+        'occupancy_rollups': len(occupancy_rows)
+    })
+
+
+def _revenue_rows(apartments, transactions, tx_apartment, tx_day, tx_type, known, since):
+    completed = known & np.array([t.status == REVENUE_STATUS for t in transactions], dtype=bool)
+    if since:
+        completed &= tx_day >= np.datetime64(since, 'D')
+    if not completed.any():
+        return []
+
+    cents = np.array([int(round(t.amount * 100)) for t in transactions], dtype=np.int64)[completed]
+    keys = np.stack([
+        _month_number(tx_day[completed].astype('datetime64[M]')),
+        tx_apartment[completed],
+        tx_type[completed]
+    ], axis=1)
+    unique_keys, group = np.unique(keys, axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    totals = np.zeros(len(unique_keys), dtype=np.int64)
+    np.add.at(totals, group, cents)
+    counts = np.bincount(group, minlength=len(unique_keys))
+
+    rows = []
+    for (month, index, type_code), total, count in zip(unique_keys.tolist(), totals.tolist(), counts.tolist()):
+        apartment = apartments[index]
+        rows.append({
+            'month': _month_date(month),
+            'owner_id': apartment.owner_id,
+            'apartment_id': apartment.id,
+            'transaction_type': TRANSACTION_TYPES[type_code],
+            'city': apartment.city,
+            'revenue': Decimal(total) / 100,
+            'transactions': count
+        })
+    return rows
+
+
+def _occupancy_rows(apartments, tx_apartment, tx_day, tx_type, known, months, today):
+    # Lease boundaries of each apartment in date order; a Rent row starts a
+    # lease that ends where the apartment's next boundary row starts
+    boundary = known & np.isin(tx_type, [TRANSACTION_TYPES.index(t) for t in LEASE_BOUNDARY_TYPES])
+    b_apartment, b_day, b_type = tx_apartment[boundary], tx_day[boundary], tx_type[boundary]
+    b_end = np.full(len(b_day), np.datetime64('NaT'), dtype='datetime64[D]')
+    same_apartment = b_apartment[1:] == b_apartment[:-1]
+    b_end[:-1][same_apartment] = b_day[1:][same_apartment]
+
+    # Latest lease of an apartment: ongoing while it is Rented, else ended when its status changed
+    current_month_end = np.datetime64(next_month(month_start(today)), 'D')
+    rented = np.array([a.status == 'Rented' for a in apartments], dtype=bool)
+    status_changed = _days([a.status_changed_at for a in apartments])
+    latest = np.isnat(b_end)
+    ended_at = status_changed[b_apartment]
+    start_month_end = (b_day.astype('datetime64[M]') + 1).astype('datetime64[D]')
+    # Without a recorded status change (rows older than the column) count the start month only
+    ended_at = np.where(np.isnat(ended_at), start_month_end, np.maximum(ended_at, b_day))
+    b_end[latest] = np.where(rented[b_apartment], current_month_end, ended_at)[latest]
+
+    lease = b_type == TRANSACTION_TYPES.index('Rent')
+    lease_apartment, lease_start, lease_end = b_apartment[lease], b_day[lease], b_end[lease]
+    created = _days([a.created_at for a in apartments])
+    created = np.where(np.isnat(created), np.datetime64(date.min, 'D'), created)
+
+    rows = []
+    for month in months:
+        month_begin = month.astype('datetime64[D]')
+        month_end = (month + 1).astype('datetime64[D]')
+        overlap = (np.minimum(lease_end, month_end) - np.maximum(lease_start, month_begin)).astype(np.int64)
+        occupied = np.bincount(lease_apartment, weights=np.clip(overlap, 0, None), minlength=len(apartments))
+        listed = np.clip((month_end - np.maximum(created, month_begin)).astype(np.int64), 0, None)
+
+        month_date = _month_date(_month_number(month))
+        for index in np.nonzero((listed > 0) | (occupied > 0))[0].tolist():
+            apartment = apartments[index]
+            rows.append({
+                'month': month_date,
+                'owner_id': apartment.owner_id,
+                'apartment_id': apartment.id,
+                'city': apartment.city,
+                'listed_days': int(listed[index]),
+                'occupied_days': int(occupied[index])
+            })
+    return rows
+
+
+# Reads
+def rollup_report(group_by, first_month, last_month, owner_id=None, city=None):
+    """
+    Revenue, occupancy rate and vacancy days per month and owner (or city)
+    between two months, from two GROUP BY queries over the rollup tables.
+    """
+    report = {}
+
+    def entry(month, key):
+        item = report.get((month, key))
+        if item is None:
+            item = report[(month, key)] = {
+                'month': month.strftime('%Y-%m'), group_by: key, 'revenue': 0.0, 'transactions': 0,
+                'revenue_by_type': {}, 'listed_days': 0, 'occupied_days': 0
+            }
+        return item
+
+    for model, columns in (
+        (RevenueRollup, [RevenueRollup.transaction_type,
+                         func.sum(RevenueRollup.revenue).label('revenue'),
+                         func.sum(RevenueRollup.transactions).label('transactions')]),
+        (OccupancyRollup, [func.sum(OccupancyRollup.listed_days).label('listed_days'),
+                           func.sum(OccupancyRollup.occupied_days).label('occupied_days')]),
+    ):
+        key = model.owner_id if group_by == 'owner_id' else model.city
+        query = select(model.month, key.label('key'), *columns) \
+            .where(model.month >= first_month, model.month <= last_month) \
+            .group_by(model.month, key, *columns[:1] if model is RevenueRollup else [])
+        if owner_id is not None:
+            query = query.where(model.owner_id == owner_id)
+        if city:
+            query = query.where(model.city == city)
+
+        for row in db.session.execute(query):
+            item = entry(row.month, row.key)
+            if model is RevenueRollup:
+                item['revenue_by_type'][row.transaction_type] = float(row.revenue)
+                item['revenue'] += float(row.revenue)
+                item['transactions'] += int(row.transactions)
+            else:
+                item['listed_days'] = int(row.listed_days)
+                item['occupied_days'] = int(row.occupied_days)
+
+    for item in report.values():
+        item['revenue'] = round(item['revenue'], 2)
+        item['vacancy_days'] = max(item['listed_days'] - item['occupied_days'], 0)
+        item['occupancy_rate'] = round(item['occupied_days'] / item['listed_days'], 4) if item['listed_days'] else None
+    return [report[key] for key in sorted(report, key=lambda k: (k[0], str(k[1])))]
@@ -0,0 +1,160 @@
+# search_index.py
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import joinedload
+from Classes.config import db
+from Classes.Apartment import Apartment
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# BM25 tuning constants
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class ApartmentSearchIndex:
+    """
+    In-process inverted index over the searchable apartment columns.
+
+    Used when the database has no FULLTEXT support (SQLite in local setups).
+    It is built lazily on the first search and then kept up to date by the
+    apartment write routes through add() and remove().
+    """
+
+    FIELDS = ('location', 'city', 'unit_number', 'description')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)  # token -> {apartment_id: term frequency}
+        self._documents = {}                # apartment_id -> Counter of its tokens
+        self._lengths = {}                  # apartment_id -> number of tokens
+        self._total_length = 0
+        self.built = False
+
+    def _document_tokens(self, row):
+        tokens = []
+        for field in self.FIELDS:
+            tokens.extend(tokenize(getattr(row, field)))
+        return Counter(tokens)
+
+    def _index(self, apartment_id, counts):
+        self._documents[apartment_id] = counts
+        self._lengths[apartment_id] = sum(counts.values())
+        self._total_length += self._lengths[apartment_id]
+        for token, tf in counts.items():
+            self._postings[token][apartment_id] = tf
+
+    def _unindex(self, apartment_id):
+        counts = self._documents.pop(apartment_id, None)
+        if counts is None:
+            return
+        self._total_length -= self._lengths.pop(apartment_id)
+        for token in counts:
+            postings = self._postings[token]
+            postings.pop(apartment_id, None)
+            if not postings:
+                del self._postings[token]
+
+    def build(self):
+        rows = (
+            db.session.query(Apartment.id, *(getattr(Apartment, f) for f in self.FIELDS))
+            .execution_options(yield_per=1000)
+        )
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._lengths.clear()
+            self._total_length = 0
+            for row in rows:
+                self._index(row.id, self._document_tokens(row))
+            self.built = True
+
+    def reset(self):
+        """Drop the index so the next search rebuilds it (after bulk writes)."""
+        with self._lock:
+            self.built = False
+            self._postings.clear()
+            self._documents.clear()
+            self._lengths.clear()
+            self._total_length = 0
+
+    def add(self, apartment):
+        """Index a new apartment, or re-index one whose text columns changed."""
+        with self._lock:
+            if not self.built:
+                return
+            self._unindex(apartment.id)
+            self._index(apartment.id, self._document_tokens(apartment))
+
+    def remove(self, apartment_id):
+        with self._lock:
+            if self.built:
+                self._unindex(apartment_id)
+
+    def search(self, q):
+        """Return [(apartment_id, score)] for every matching apartment, best first."""
+        with self._lock:
+            if not self.built:
+                self.build()
+
+            doc_count = len(self._documents)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count
+
+            scores = defaultdict(float)
+            for token in set(tokenize(q)):
+                postings = self._postings.get(token)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for apartment_id, tf in postings.items():
+                    norm = K1 * (1 - B + B * self._lengths[apartment_id] / avg_length)
+                    scores[apartment_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+
+apartment_search_index = ApartmentSearchIndex()
+
+
+def search_apartments(q, offset, limit):
+    """
+    Relevance-ranked apartment search.
+
+    Returns ([(apartment, score)], total). On MySQL this is answered by the
+    ft_apartments_text FULLTEXT index, elsewhere by apartment_search_index.
+    """
+    if db.session.connection().dialect.name == 'mysql':
+        relevance = match(
+            Apartment.location, Apartment.city, Apartment.unit_number, Apartment.description,
+            against=q
+        ).in_natural_language_mode()
+
+        total = Apartment.query.filter(relevance > 0).count()
+        rows = (
+            db.session.query(Apartment, relevance.label('score'))
+            .options(joinedload(Apartment.owner))
+            .filter(relevance > 0)
+            .order_by(relevance.desc(), Apartment.id.desc())
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+        return [(apartment, float(score)) for apartment, score in rows], total
+
+    ranked = apartment_search_index.search(q)
+    page = ranked[offset:offset + limit]
+    apartments = {
+        a.id: a
+        for a in Apartment.query.options(joinedload(Apartment.owner))
+        .filter(Apartment.id.in_([apartment_id for apartment_id, _ in page]))
+    }
+    return [(apartments[i], score) for i, score in page if i in apartments], len(ranked)
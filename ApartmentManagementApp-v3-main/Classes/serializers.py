@@ -0,0 +1,176 @@
+# serializers.py
+import os
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime, Float, Numeric
+from sqlalchemy.orm import joinedload, lazyload, load_only
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used without it
+    orjson = None
+
+DEFAULT_MEDIA_BASE_URL = 'http://localhost:5000'
+MEDIA_BASE_URL = os.environ.get('MEDIA_BASE_URL', DEFAULT_MEDIA_BASE_URL)
+
+
+def configure_serializers(app):
+    global MEDIA_BASE_URL
+    MEDIA_BASE_URL = app.config.setdefault('MEDIA_BASE_URL', MEDIA_BASE_URL).rstrip('/')
+    app.json = FastJSONProvider(app)
+
+
+def media_url(path):
+    """Absolute URL of a stored upload path such as '/static/uploads/x.jpg'."""
+    return f"{MEDIA_BASE_URL}/{path.lstrip('/')}" if path else None
+
+
+def strip_media_base(url):
+    """Inverse of media_url, for photo URLs the client sends back."""
+    return url[len(MEDIA_BASE_URL):] if url.startswith(MEDIA_BASE_URL) else url
+
+
+# Flask's default JSON encoding of these types, applied while the row is
+# serialized so the encoder only ever sees plain str/int/float/bool/None
+def _encode_decimal(value):
+    return None if value is None else str(value)
+
+
+def _encode_datetime(value):
+    return None if value is None else http_date(value)
+
+
+def column_encoder(model, attribute):
+    column = model.__table__.c.get(attribute)
+    if column is None:
+        return None
+    if isinstance(column.type, Numeric) and not isinstance(column.type, Float):
+        return _encode_decimal
+    if isinstance(column.type, (DateTime, Date)):
+        return _encode_datetime
+    return None
+
+
+class Field:
+    """
+    One output field: how to build it and which columns/relationship it reads.
+
+    `build` is either a column attribute name (copied, with Decimal/datetime
+    encoded) or a callable taking the model instance. `key` is the output
+    key when it differs from the field name, for variants of one key
+    (e.g. card-size vs full-size photos) picked by different shapes.
+    """
+
+    def __init__(self, build, columns=None, relation=None, relation_columns=(), key=None):
+        self.build = build
+        self.key = key
+        if columns is None:
+            columns = [build] if isinstance(build, str) else []
+        self.columns = tuple(columns)
+        self.relation = relation
+        self.relation_columns = tuple(relation_columns)
+
+
+class FieldSet:
+    """
+    The output fields of a model, shared by every route that serializes it.
+
+    Routes pick a subset of field names (a named shape such as
+    APARTMENT_CARD, or a ?fields= projection). load_options() turns the
+    subset into load_only()/joinedload() options so unrequested columns and
+    relationships are never SELECTed, and plan() compiles the subset once
+    into a function that builds the dict with plain attribute reads.
+    """
+
+    def __init__(self, model, fields, default=None, always_columns=('id',)):
+        self.model = model
+        self.fields = fields
+        self.default = tuple(default) if default else tuple(fields)
+        self.always_columns = tuple(always_columns)
+        self.relations = {f.relation for f in fields.values() if f.relation}
+        self._plans = {}
+
+    def parse(self, value):
+        """Requested field names from a `fields=a,b,c` value; None means the default shape."""
+        if not value:
+            return None
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = names - self.fields.keys()
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}. "
+                             f"Available: {', '.join(self.fields)}")
+        return names | {'id'}
+
+    def load_options(self, names=None):
+        names = self.default if names is None else names
+        columns = set(self.always_columns)
+        relation_columns = {}
+        for name in names:
+            field = self.fields[name]
+            columns.update(field.columns)
+            if field.relation:
+                relation_columns.setdefault(field.relation, set()).update(field.relation_columns)
+
+        options = [load_only(*[getattr(self.model, c) for c in sorted(columns)])]
+        for relation in sorted(self.relations):
+            attribute = getattr(self.model, relation)
+            if relation in relation_columns:
+                target = attribute.property.mapper.class_
+                options.append(joinedload(attribute).load_only(
+                    *[getattr(target, c) for c in sorted(relation_columns[relation])]
+                ))
+            else:
+                options.append(lazyload(attribute))
+        return options
+
+    def plan(self, names=None):
+        """The compiled serializer for a subset of fields (cached per subset)."""
+        key = frozenset(self.default if names is None else names)
+        compiled = self._plans.get(key)
+        if compiled is None:
+            compiled = self._plans[key] = self._compile(key)
+        return compiled
+
+    def _compile(self, names):
+        namespace = {}
+        items = []
+        for index, (name, field) in enumerate(self.fields.items()):
+            if name not in names:
+                continue
+            if isinstance(field.build, str):
+                expression = f'o.{field.build}'
+                encoder = column_encoder(self.model, field.build)
+                if encoder:
+                    namespace[f'e{index}'] = encoder
+                    expression = f'e{index}({expression})'
+            else:
+                namespace[f'b{index}'] = field.build
+                expression = f'b{index}(o)'
+            items.append(f'{field.key or name!r}: {expression}')
+
+        source = f"def serialize(o):\n    return {{{', '.join(items)}}}\n"
+        exec(compile(source, f'<{self.model.__name__} serializer>', 'exec'), namespace)
+        return namespace['serialize']
+
+    def serialize(self, obj, names=None):
+        return self.plan(names)(obj)
+
+    def serialize_many(self, objs, names=None):
+        plan = self.plan(names)
+        return [plan(obj) for obj in objs]
+
+
+ORJSON_OPTIONS = (
+    orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if orjson else 0
+)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that uses orjson when it is installed, with the same output."""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)
+        option = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if kwargs.get('indent') else 0)
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
@@ -0,0 +1,122 @@
+# static_files.py
+import gzip
+import mimetypes
+import os
+import re
+from flask import abort, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # optional; only .gz siblings are built without it
+    brotli = None
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Files whose name changes whenever their content does, so they can be
+# cached forever: content-addressed uploads and their variants, and the
+# Angular build output (main-H7YQI7NF.js, styles-5INURTSO.css, ...)
+CONTENT_HASHED = [
+    re.compile(r'^uploads/(variants/)?blobs/'),
+    re.compile(r'^[^/]+-[0-9A-Z]{8}\.(js|css|mjs)$'),
+]
+
+COMPRESSIBLE_EXTENSIONS = {'.js', '.mjs', '.css', '.html', '.svg', '.json', '.txt', '.map', '.xml', '.ico'}
+MIN_COMPRESS_SIZE = 1024
+
+# Preferred first; only used when the client accepts the encoding and a
+# prebuilt sibling file exists (see compress_assets)
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+
+
+def is_content_hashed(filename):
+    return any(pattern.search(filename) for pattern in CONTENT_HASHED)
+
+
+def _precompressed_sibling(folder, filename):
+    if os.path.splitext(filename)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+        return None, None
+    for encoding, suffix in PRECOMPRESSED:
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(folder, filename + suffix)):
+            return filename + suffix, encoding
+    return None, None
+
+
+def send_static(folder, filename):
+    """
+    Serve a static file with Range support, long-lived caching for content
+    hashed names and prebuilt .br/.gz siblings.
+
+    Range and conditional requests come from Werkzeug's send_file. The file
+    body is handed to the server's wsgi.file_wrapper, which uses sendfile()
+    where available, or to the front-end web server when USE_X_SENDFILE is on.
+    """
+    filename = filename.replace('\\', '/')
+    if any(part.startswith('.') for part in filename.split('/')):
+        abort(404)  # upload staging, resumable sessions and quarantine are private
+
+    immutable = is_content_hashed(filename)
+    encoded_name, encoding = _precompressed_sibling(folder, filename)
+    response = send_from_directory(
+        folder,
+        encoded_name or filename,
+        mimetype=mimetypes.guess_type(filename)[0] if encoding else None,
+        max_age=IMMUTABLE_MAX_AGE if immutable else None,
+        conditional=True
+    )
+
+    if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+        response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True  # revalidate with ETag / Last-Modified
+    return response
+
+
+def configure_static_files(app):
+    """Route the app's /static endpoint through send_static()."""
+    if 'USE_X_SENDFILE' in os.environ:  # Flask's default config already has the key (False)
+        app.config['USE_X_SENDFILE'] = os.environ['USE_X_SENDFILE'].lower() in ('1', 'true', 'yes')
+    app.view_functions['static'] = lambda filename: send_static(app.static_folder, filename)
+
+
+def compress_assets(folder):
+    """
+    Write .gz (and .br, with the brotli package) siblings next to every
+    compressible file under `folder` that lacks an up-to-date one. Returns
+    (files compressed, original bytes, compressed bytes).
+    """
+    compressed = original_bytes = encoded_bytes = 0
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d != 'uploads']
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            stat = os.stat(path)
+            if stat.st_size < MIN_COMPRESS_SIZE:
+                continue
+
+            data = None
+            for encoding, suffix in PRECOMPRESSED:
+                if encoding == 'br' and brotli is None:
+                    continue
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= stat.st_mtime:
+                    continue
+                if data is None:
+                    with open(path, 'rb') as source:
+                        data = source.read()
+                body = brotli.compress(data, quality=11) if encoding == 'br' else gzip.compress(data, 9, mtime=0)
+                if len(body) >= len(data):
+                    continue
+                with open(target + '.part', 'wb') as out:
+                    out.write(body)
+                os.replace(target + '.part', target)
+                compressed += 1
+                original_bytes += len(data)
+                encoded_bytes += len(body)
+    return compressed, original_bytes, encoded_bytes
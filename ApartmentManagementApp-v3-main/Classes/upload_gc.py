@@ -0,0 +1,128 @@
+# upload_gc.py
+import logging
+import os
+import shutil
+import time
+from Classes.config import db
+from Classes.MediaBlob import MediaBlob
+from Classes.media import UPLOAD_FOLDER, is_blob, path_list, upload_web_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRACE_SECONDS = 24 * 3600
+QUARANTINE_FOLDER = f'{UPLOAD_FOLDER}/.quarantine'
+# Resumable upload sessions are expired by ResumableUploads.expire(), and
+# quarantined files are the collector's own output
+SKIPPED_FOLDERS = {'.partial', '.quarantine'}
+
+
+def referenced_paths(media_sets, batch_size=1000):
+    """
+    Every upload path a row still points at, as paths relative to the
+    uploads folder. Rows are streamed, so only the set itself is held in
+    memory; rendered variants of referenced uploads count as referenced.
+    """
+    prefix = f'/{UPLOAD_FOLDER}/'
+    referenced = set()
+    for media_set in media_sets:
+        columns = [getattr(media_set.model, media_set.paths)]
+        if media_set.variants:
+            columns.append(getattr(media_set.model, media_set.variants))
+        rows = db.session.query(*columns).filter(columns[0].isnot(None)) \
+            .execution_options(stream_results=True, yield_per=batch_size)
+        for row in rows:
+            paths = path_list(row[0])
+            if media_set.variants and row[1]:
+                paths = paths + [url for urls in row[1].values() for url in urls.values()]
+            for path in paths:
+                web_path = upload_web_path(path)
+                if web_path:
+                    referenced.add(web_path[len(prefix):])
+    db.session.rollback()
+    return referenced
+
+
+def _walk(folder, relative=''):
+    with os.scandir(os.path.join(folder, relative)) as entries:
+        for entry in entries:
+            name = f'{relative}/{entry.name}' if relative else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if name not in SKIPPED_FOLDERS:
+                    yield from _walk(folder, name)
+            elif entry.is_file(follow_symlinks=False):
+                yield name, entry.stat(follow_symlinks=False)
+
+
+def _remove(name, quarantine):
+    source = os.path.join(UPLOAD_FOLDER, name)
+    if quarantine:
+        target = os.path.join(QUARANTINE_FOLDER, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(source, target)
+    else:
+        os.remove(source)
+
+
+def _collect(name, cutoff, quarantine):
+    """
+    Remove one orphan candidate unless it became young or referenced since
+    the scan. A blob's media_blobs row is locked (as store_file() does) for
+    the re-check and the delete, so an upload reusing the blob either waits
+    for the delete and writes the file again, or keeps it. Returns the
+    outcome: 'removed', 'young', 'referenced' or 'failed'.
+    """
+    web_path = f'/{UPLOAD_FOLDER}/{name}'
+    try:
+        blob = MediaBlob.query.filter_by(path=web_path).with_for_update().one_or_none() \
+            if is_blob(web_path) else None
+        if blob is not None and blob.ref_count > 0:
+            return 'referenced'
+        try:
+            if os.stat(os.path.join(UPLOAD_FOLDER, name)).st_mtime > cutoff:
+                return 'young'
+            _remove(name, quarantine)
+        except FileNotFoundError:
+            pass  # already gone; drop the row all the same
+        except OSError as e:
+            logger.warning(f"Could not remove orphaned upload {name}: {str(e)}")
+            return 'failed'
+        if blob is not None:
+            db.session.delete(blob)
+        return 'removed'
+    finally:
+        db.session.commit()  # releases the row lock
+
+
+def collect_garbage(media_sets, grace_seconds=DEFAULT_GRACE_SECONDS, quarantine=False, dry_run=False):
+    """
+    Delete (or move to QUARANTINE_FOLDER) upload files no row references
+    and that are older than `grace_seconds`, so uploads whose row is still
+    being committed are left alone; store_file() touches a blob it reuses,
+    so its age counts from the latest upload. Each candidate is re-checked
+    under its blob row lock before it is removed, see _collect(). Returns
+    counts and bytes reclaimed.
+    """
+    referenced = referenced_paths(media_sets)
+    cutoff = time.time() - grace_seconds
+    stats = {'referenced': len(referenced), 'scanned': 0, 'orphaned': 0, 'young': 0, 'bytes': 0}
+
+    candidates = []
+    for name, info in _walk(UPLOAD_FOLDER):
+        stats['scanned'] += 1
+        if name in referenced:
+            continue
+        if info.st_mtime > cutoff:
+            stats['young'] += 1
+            continue
+        candidates.append((name, info.st_size))
+
+    for name, size in candidates:
+        outcome = 'removed' if dry_run else _collect(name, cutoff, quarantine)
+        if outcome == 'young':
+            stats['young'] += 1
+        elif outcome == 'referenced':
+            stats['referenced'] += 1
+        elif outcome == 'removed':
+            stats['orphaned'] += 1
+            stats['bytes'] += size
+    return stats
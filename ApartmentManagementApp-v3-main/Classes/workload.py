@@ -0,0 +1,146 @@
+# workload.py
+from collections import Counter, defaultdict
+from sqlalchemy import case, delete, event, func, insert, inspect, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from Classes.config import db
+from Classes.MaintenanceRequest import MaintenanceRequest
+from Classes.TechnicianWorkload import TechnicianWorkload
+
+COUNTERS = ('total', 'pending', 'in_progress', 'resolved', 'rejected')
+# Status -> the counter it is tallied in besides `total`; rejected requests
+# are left out of `total`
+STATUS_COUNTERS = {
+    'Pending': 'pending',
+    'In Progress': 'in_progress',
+    'Resolved': 'resolved',
+    'Rejected': 'rejected',
+}
+DEFAULT_STATUS = 'Pending'  # server default of maintenance_requests.status
+
+
+def counters_for(status):
+    counters = [] if status == 'Rejected' else ['total']
+    if status in STATUS_COUNTERS:
+        counters.append(STATUS_COUNTERS[status])
+    return counters
+
+
+def _stored_values(connection, state):
+    """(technician_id, status) of a persistent request as it is in the database."""
+    table = MaintenanceRequest.__table__
+    values = []
+    for name in ('technician_id', 'status'):
+        history = state.attrs[name].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        else:  # attribute was never loaded (load_only, expired): ask the database
+            return tuple(connection.execute(
+                select(table.c.technician_id, table.c.status).where(table.c.id == state.identity[0])
+            ).one())
+    return tuple(values)
+
+
+def _new_values(state, stored):
+    values = []
+    for index, name in enumerate(('technician_id', 'status')):
+        history = state.attrs[name].history
+        values.append(history.added[0] if history.added else stored[index])
+    return tuple(values)
+
+
+def _count(deltas, values, sign):
+    technician_id, status = values
+    if technician_id is not None:
+        for counter in counters_for(status or DEFAULT_STATUS):
+            deltas[technician_id][counter] += sign
+
+
+def _upsert(connection, technician_id, delta):
+    table = TechnicianWorkload.__table__
+    row = dict({counter: 0 for counter in COUNTERS}, technician_id=technician_id, **delta)
+    increments = {counter: table.c[counter] + amount for counter, amount in delta.items()}
+
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        connection.execute(mysql_insert(table).values(row).on_duplicate_key_update(increments))
+    elif dialect == 'sqlite':
+        connection.execute(sqlite_insert(table).values(row).on_conflict_do_update(
+            index_elements=[table.c.technician_id], set_=increments
+        ))
+    elif connection.execute(
+        update(table).where(table.c.technician_id == technician_id).values(increments)
+    ).rowcount == 0:
+        connection.execute(insert(table).values(row))
+
+
+def _before_flush(session, flush_context, instances):
+    deltas = defaultdict(Counter)
+    connection = None
+    for obj in session.new:
+        if isinstance(obj, MaintenanceRequest):
+            _count(deltas, (obj.technician_id, obj.status), 1)
+
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, MaintenanceRequest):
+            continue
+        state = inspect(obj)
+        if obj in session.dirty and not any(
+            state.attrs[name].history.has_changes() for name in ('technician_id', 'status')
+        ):
+            continue
+        connection = connection or session.connection()
+        stored = _stored_values(connection, state)
+        _count(deltas, stored, -1)
+        if obj not in session.deleted:
+            _count(deltas, _new_values(state, stored), 1)
+
+    for technician_id, delta in deltas.items():
+        delta = {counter: amount for counter, amount in delta.items() if amount}
+        if delta:
+            _upsert(session.connection(), technician_id, delta)
+
+
+def track_workloads(session):
+    """
+    Keep technician_workloads in step with maintenance_requests.
+
+    Every flush that adds, deletes or changes the status or technician_id
+    of a MaintenanceRequest applies the matching counter increments in the
+    same transaction, so routes and the model's transition methods need no
+    extra calls. Bulk UPDATE/DELETE statements bypass the ORM and are not
+    seen; rebuild_workloads() corrects any drift.
+    """
+    event.listen(session, 'before_flush', _before_flush)
+
+
+def rebuild_workloads():
+    """Recompute every technician's counters from maintenance_requests. Returns the number of technicians."""
+    status = MaintenanceRequest.status
+    tallies = [func.sum(case((status != 'Rejected', 1), else_=0))]
+    for counter in COUNTERS[1:]:
+        statuses = [s for s, c in STATUS_COUNTERS.items() if c == counter]
+        tallies.append(func.sum(case((status.in_(statuses), 1), else_=0)))
+
+    counts = select(MaintenanceRequest.technician_id, *tallies) \
+        .where(MaintenanceRequest.technician_id.isnot(None)) \
+        .group_by(MaintenanceRequest.technician_id)
+
+    db.session.execute(delete(TechnicianWorkload))
+    result = db.session.execute(
+        insert(TechnicianWorkload).from_select(['technician_id', *COUNTERS], counts)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def workloads_for(technician_ids):
+    """{technician_id: counters} for the given technicians, zeros for those without requests."""
+    rows = {
+        w.technician_id: w
+        for w in TechnicianWorkload.query.filter(TechnicianWorkload.technician_id.in_(technician_ids))
+    }
+    empty = TechnicianWorkload(**{counter: 0 for counter in COUNTERS})
+    return {technician_id: rows.get(technician_id, empty).to_dict() for technician_id in technician_ids}
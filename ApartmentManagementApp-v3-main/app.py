@@ -1,20 +1,52 @@
+import math
 import re
-import uuid
-from flask import Flask, jsonify, request
+import time
+import click
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
+from werkzeug.datastructures import MultiDict
 import os
 import logging
-from sqlalchemy import exc
-from sqlalchemy.orm import joinedload
+from sqlalchemy import case, event, exc, func, or_, select, update
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import aliased, joinedload, load_only
 from Classes.config import configure_app, db
-from Classes.Apartment import Apartment
-from Classes.MaintenanceRequest import MaintenanceRequest
-from Classes.User import User
+from Classes.Apartment import (
+    APARTMENT_DETAIL, APARTMENT_FIELDS, APARTMENT_OWNED, APARTMENT_PHOTOS, APARTMENT_VIDEO, Apartment
+)
+from Classes.MaintenanceRequest import (
+    MAINTENANCE_IMAGES, MAINTENANCE_PROFILES, MAINTENANCE_REQUEST_FIELDS, MaintenanceRequest
+)
+from Classes.User import USER_FIELDS, USER_PROFILE, USER_SUMMARY, User
 from Classes.Payment import Payment
 from Classes.Message import Message
 from Classes.Transaction import Transaction
-from Classes.Contract import Contract
+from Classes.Contract import CONTRACT_FIELDS, Contract
+from Classes.TechnicianSchedule import TechnicianSchedule
+from Classes.pagination import clamp_limit, encode_cursor, keyset_page
+from Classes.query_checks import used_indexes
+from Classes.search_index import apartment_search_index, search_apartments
+from Classes.response_cache import cached_response, response_cache
+from Classes.geo import cell_ranges, grid_cell, haversine_km, parse_coordinates
+from Classes.export import EXPORT_FORMATS, stream_rows
+from Classes.bulk_import import ImportFileError, import_apartments, iter_records
+from Classes.upload_gc import QUARANTINE_FOLDER, collect_garbage
+from Classes.static_files import compress_assets, configure_static_files
+from Classes.resumable import (
+    TUS_CHECKSUM_ALGORITHMS, TUS_EXTENSIONS, TUS_VERSION, UploadError, parse_checksum, parse_metadata,
+    resumable_uploads
+)
+from Classes.serializers import configure_serializers, strip_media_base
+from Classes.billing import billing_period, generate_rent_payments, mark_overdue
+from Classes.rollups import (
+    LEASE_BOUNDARY_TYPES, next_month, rebuild_rollups, record_lease_change, record_transaction, rollup_report
+)
+from Classes.workload import rebuild_workloads, track_workloads, workloads_for
+from Classes.media import (
+    UPLOAD_FOLDER, derivative_pipeline, disk_path, hash_file, is_blob, purge_unreferenced,
+    recount_references, release, remove_upload_files, retain, store_file, store_upload, stored_path,
+    update_references, upload_extension, upload_web_path
+)
 
 from werkzeug.security import generate_password_hash
 import jwt
@@ -32,15 +64,23 @@ app = Flask(__name__)
 configure_app(app)
 CORS(app, supports_credentials=True, origins="http://localhost:4200", 
      methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
+response_cache.configure(app)
+configure_serializers(app)
+derivative_pipeline.configure(app)
+resumable_uploads.configure(app)
+configure_static_files(app)
+track_workloads(db.session)
 
 # Database logging
 logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
 
 # Constants
 VALID_STATUSES = ['Pending', 'In Progress', 'Resolved', 'Cancelled', 'Rejected']
-UPLOAD_FOLDER = 'static/uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'webm', 'mov', 'm4v'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Caps any single request body; large videos go through the resumable /uploads endpoints
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 def allowed_file(filename):
@@ -117,8 +157,13 @@ def token_required(f):
 #############Users Route#######################
 @app.route('/users')
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    try:
+        fields = USER_FIELDS.parse(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    users = User.query.options(*USER_FIELDS.load_options(fields)).all()
+    return jsonify(USER_FIELDS.serialize_many(users, fields))
 
 
 SECRET_KEY = 'YOUR_SECRET_KEY'  # Replace with a strong secret key or load from env
@@ -198,155 +243,480 @@ def is_valid_email(email: str) -> bool:
     return bool(re.match(email_regex, email))
 
 
+############### Response cache tags for the apartment read routes #################
+# Write routes invalidate these tags through response_cache.invalidate()
+def apartment_list_tags(view_args, payload):
+    return ['apartments']
+
+
+def apartment_detail_tags(view_args, payload):
+    # The detail embeds the owner and buyer, so edits to either user drop it too
+    people = [payload.get(role) for role in ('owner', 'buyer')] if payload else []
+    return [f"apartment:{view_args['id']}"] + [f"user:{p['id']}" for p in people if p]
+
+
+def user_apartments_tags(view_args, payload):
+    return [f"user:{view_args['user_id']}"] + [f"apartment:{a['id']}" for a in payload or []]
+
+
+def invalidate_rendered_variants(model, row_id):
+    """Cached listings point at the originals until the variants are stored."""
+    if model is Apartment:
+        response_cache.invalidate('apartments', f'apartment:{row_id}')
+
+
+derivative_pipeline.listeners.append(invalidate_rendered_variants)
+
+
+# Apartment cards and details embed their owner's and buyer's contact
+# fields, so any committed change to a user (whichever route made it) drops
+# the listings and the entries tagged with that user
+@event.listens_for(db.session, 'after_flush')
+def collect_changed_users(session, flush_context):
+    changed = session.info.setdefault('changed_users', set())
+    changed.update(obj.id for obj in session.deleted if isinstance(obj, User))
+    changed.update(obj.id for obj in session.dirty if isinstance(obj, User) and session.is_modified(obj))
+
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_changed_users(session):
+    changed = session.info.pop('changed_users', None)
+    if changed:
+        response_cache.invalidate('apartments', *(f'user:{user_id}' for user_id in changed))
+
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_changed_users(session):
+    session.info.pop('changed_users', None)
+
+# Every column that references upload files, for reference counting and GC
+REFERENCED_MEDIA = (APARTMENT_PHOTOS, APARTMENT_VIDEO, MAINTENANCE_IMAGES)
+
+
 # Route to get apartments related to a specific user
 @app.route('/user/<int:user_id>/apartments', methods=['GET'])
+@cached_response(user_apartments_tags)
 def get_user_apartments(user_id):
     transactions = Transaction.query.filter_by(user_id=user_id).all()
     apartment_ids = {t.apartment_id for t in transactions}
 
-    apartments = Apartment.query.filter(Apartment.id.in_(apartment_ids)).all()
+    apartments = Apartment.query.options(*APARTMENT_FIELDS.load_options(APARTMENT_OWNED)) \
+        .filter(Apartment.id.in_(apartment_ids)).all()
 
-    return jsonify([{
-        'id': apt.id,
-        'location': apt.location,
-        'unit_number': apt.unit_number,
-        'area': apt.area,
-        'number_of_rooms': apt.number_of_rooms,
-        'type': apt.type,
-        'description': apt.description,
-        'photos': [f"http://localhost:5000{photo}" for photo in apt.photos] if apt.photos else None,
-        'status': apt.status,
-        'created_at': apt.created_at
-    } for apt in apartments])
+    return jsonify(APARTMENT_FIELDS.serialize_many(apartments, APARTMENT_OWNED))
 
 
-###Route to get all apartments and apply filters on them
-@app.route('/apartments')
-def get_apartments():
-    price_min = request.args.get('price_min', type=int)
-    price_max = request.args.get('price_max', type=int)
-    city = request.args.get('city', type=str)
-    location = request.args.get('location', type=str)
-    area_min = request.args.get('area_min', type=int)
-    area_max = request.args.get('area_max', type=int)
-    apt_type = request.args.get('type', type=str)
-    unit_number = request.args.get('unit_number', type=str)
-    status = request.args.get('status', type=str)
-    query = Apartment.query
+###Helpers shared by the apartment listing routes
+def like_prefix(value):
+    """LIKE pattern matching `value` as a prefix, with wildcards in the input escaped."""
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'{escaped}%'
+
+
+def canonical_enum_value(column, value):
+    """Map user input such as 'available' onto the stored ENUM spelling ('Available')."""
+    choices = {choice.lower(): choice for choice in column.type.enums}
+    return choices.get(value.strip().lower(), value)
+
+
+def apply_apartment_filters(query, args):
+    """
+    Apply the get_apartments query-string filters to an Apartment query.
+
+    `status` and `type` are matched exactly and `city`, `location` and
+    `unit_number` by prefix, so MySQL can use the apartment indexes.
+    Passing `match=substring` restores the old ILIKE '%x%' matching.
+    """
+    price_min = args.get('price_min', type=int)
+    price_max = args.get('price_max', type=int)
+    city = args.get('city', type=str)
+    location = args.get('location', type=str)
+    area_min = args.get('area_min', type=int)
+    area_max = args.get('area_max', type=int)
+    apt_type = args.get('type', type=str)
+    unit_number = args.get('unit_number', type=str)
+    status = args.get('status', type=str)
+    substring = args.get('match', type=str) == 'substring'
+
+    def text_filter(column, value):
+        if substring:
+            return column.ilike(f'%{value}%')
+        return column.like(like_prefix(value), escape='\\')
+
+    def enum_filter(column, value):
+        if substring:
+            return column.ilike(f'%{value}%')
+        return column == canonical_enum_value(column, value)
 
     if status:
-        query = query.filter(Apartment.status.ilike(f'%{status}%'))
+        query = query.filter(enum_filter(Apartment.status, status))
     if apt_type:
-        query = query.filter(Apartment.type.ilike(f'%{apt_type}%'))
+        query = query.filter(enum_filter(Apartment.type, apt_type))
     if price_min:
         query = query.filter(Apartment.price >= price_min)
     if price_max:
         query = query.filter(Apartment.price <= price_max)
     if city:
-        query = query.filter(Apartment.city.ilike(f'%{city}%'))
+        query = query.filter(text_filter(Apartment.city, city))
     if location:
-        query = query.filter(Apartment.location.ilike(f'%{location}%'))
+        query = query.filter(text_filter(Apartment.location, location))
     if area_min:
         query = query.filter(Apartment.area >= area_min)
     if area_max:
         query = query.filter(Apartment.area <= area_max)
     if unit_number:
-        query = query.filter(Apartment.unit_number.ilike(f'%{unit_number}%'))
-
-    apartments = query.all()
-
-    result = []
-    for a in apartments:
-        owner = a.owner  
-        result.append({
-            'id': a.id,
-            'owner_id': a.owner_id,
-            'location': a.location,
-            'price': a.price,
-            'city': a.city,
-            'unit_number': a.unit_number,
-            'area': a.area,
-            'number_of_rooms': a.number_of_rooms,
-            'type': a.type,
-            'description': a.description,
-            'photos': [f"http://localhost:5000/{p}" for p in a.photos] if a.photos else [],
-            'video': f"http://localhost:5000/{a.video}" if a.video else None,   # <-- ADD VIDEO URL
-            'parking_availability': bool(a.parking_availability),
-            'status': a.status,
-            'created_at': a.created_at,
-            'owner': {
-                'id': owner.id,
-                'full_name': owner.full_name,
-                'email': owner.email,
-                'phone_number': owner.phone_number
-            } if owner else None
-        })
+        query = query.filter(text_filter(Apartment.unit_number, unit_number))
 
-    return jsonify(result)
+    return query
 
 
+###Route to get all apartments and apply filters on them
+# Passing `limit` and/or `cursor` switches to keyset pagination ordered by
+# (created_at, id), newest first: {"items": [...], "next_cursor": "..."}.
+# Without them the full filtered list is returned as before.
+@app.route('/apartments')
+@cached_response(apartment_list_tags)
+def get_apartments():
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', type=str)
+    try:
+        fields = APARTMENT_FIELDS.parse(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
+    # Only the requested columns are SELECTed, and the owner (when requested)
+    # is loaded in the same SELECT instead of one query per apartment
+    query = Apartment.query.options(*APARTMENT_FIELDS.load_options(fields))
+    query = apply_apartment_filters(query, request.args)
 
-###Route to get spsfc app
-@app.route('/apartments/<int:id>', methods=['GET'])
-def get_apartment(id):
-    apartment = Apartment.query.get_or_404(id)
+    if limit is None and not cursor:
+        return jsonify(APARTMENT_FIELDS.serialize_many(query.all(), fields))
 
-    transaction = None
-    if apartment.status in ['Sold', 'Rented','Available']:
-        transaction = Transaction.query.filter_by(apartment_id=apartment.id).first()
+    try:
+        apartments, next_cursor = keyset_page(query, Apartment.created_at, Apartment.id, cursor, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     return jsonify({
-        'id': apartment.id,
-        'owner_id': apartment.owner_id,
-        'location': apartment.location,
-        'city': apartment.city,
-        'price': apartment.price,
-        'unit_number': apartment.unit_number,
-        'area': apartment.area,
-        'number_of_rooms': apartment.number_of_rooms,
-        'type': apartment.type,
-        'description': apartment.description,
-        'photos': [f"http://localhost:5000/{p}" for p in apartment.photos] if apartment.photos else [],
-        'parking_availability': bool(apartment.parking_availability),
-        'video': f"http://localhost:5000/{apartment.video}" if apartment.video else None,
-        'map_location': getattr(apartment, 'map_location', None),
-        'status': apartment.status,
-        'created_at': apartment.created_at,
-        'owner': {
-            'id': apartment.owner.id,
-            'full_name': apartment.owner.full_name,
-            'email': apartment.owner.email,
-            'phone_number': apartment.owner.phone_number
-        } if apartment.owner else None,
-        'buyer': transaction.user.to_dict() if transaction else None
+        'items': APARTMENT_FIELDS.serialize_many(apartments, fields),
+        'next_cursor': next_cursor
     })
 
 
-@app.route('/api/maintenance-requests', methods=['GET'])
-def get_maintenance_requests():
-    category = request.args.get('category')
-    status = request.args.get('status')
-    search_term = request.args.get('searchTerm')
-    user_id = request.args.get('user_id', type=int)
 
-    query = MaintenanceRequest.query.options(
-        joinedload(MaintenanceRequest.user),
-        joinedload(MaintenanceRequest.technician),
-        joinedload(MaintenanceRequest.apartment)
+
+###Route for ranked free-text search over location, city, unit number and description
+@app.route('/apartments/search', methods=['GET'])
+@cached_response(apartment_list_tags)
+def search_apartments_route():
+    q = request.args.get('q', type=str, default='').strip()
+    page = max(request.args.get('page', type=int, default=1), 1)
+    limit = clamp_limit(request.args.get('limit', type=int))
+
+    if not q:
+        return jsonify({'error': 'q is required'}), 400
+
+    results, total = search_apartments(q, (page - 1) * limit, limit)
+
+    return jsonify({
+        'items': [dict(APARTMENT_FIELDS.serialize(a), score=round(score, 4)) for a, score in results],
+        'total': total,
+        'page': page,
+        'limit': limit
+    })
+
+
+###Route for the filter panel counts of the buy/rent pages
+FACET_COLUMNS = {
+    'city': Apartment.city,
+    'type': Apartment.type,
+    'status': Apartment.status,
+    'number_of_rooms': Apartment.number_of_rooms,
+}
+HISTOGRAM_BUCKETS = 10
+
+
+def without_args(args, *names):
+    """Copy of the query args with the given filters removed."""
+    return MultiDict([(k, v) for k, v in args.items(multi=True) if k not in names])
+
+
+def nice_bucket_width(low, high, buckets):
+    """Round (high - low) / buckets up to 1, 2 or 5 times a power of ten."""
+    span = max(high - low, 1) / buckets
+    magnitude = 10 ** math.floor(math.log10(span))
+    for step in (1, 2, 5, 10):
+        if span <= step * magnitude:
+            return max(int(step * magnitude), 1)
+
+
+def apartment_histogram(column, args, width=None):
+    low, high = apply_apartment_filters(
+        db.session.query(func.min(column), func.max(column)), args
+    ).one()
+    if low is None:
+        return {'bucket_width': width, 'buckets': []}
+
+    width = width or nice_bucket_width(float(low), float(high), HISTOGRAM_BUCKETS)
+    bucket = (column // width).label('bucket')
+    rows = apply_apartment_filters(
+        db.session.query(bucket, func.count(Apartment.id)), args
+    ).group_by(bucket).order_by(bucket).all()
+
+    return {
+        'bucket_width': width,
+        'buckets': [{
+            'min': int(b) * width,
+            'max': (int(b) + 1) * width,
+            'count': count
+        } for b, count in rows]
+    }
+
+
+@app.route('/apartments/facets', methods=['GET'])
+@cached_response(apartment_list_tags)
+def get_apartment_facets():
+    """
+    Counts per city/type/status/number_of_rooms and price/area histograms,
+    computed with GROUP BY under the same filters as get_apartments.
+    Each facet ignores its own filter so the panel keeps showing the
+    alternatives (e.g. the city counts ignore `city`).
+    """
+    args = request.args
+    facets = {}
+
+    for name, column in FACET_COLUMNS.items():
+        rows = apply_apartment_filters(
+            db.session.query(column, func.count(Apartment.id)), without_args(args, name)
+        ).group_by(column).all()
+        facets[name] = sorted(
+            [{'value': value, 'count': count} for value, count in rows],
+            key=lambda f: (-f['count'], str(f['value']))
+        )
+
+    facets['price'] = apartment_histogram(
+        Apartment.price, without_args(args, 'price_min', 'price_max'),
+        args.get('price_bucket', type=int)
+    )
+    facets['area'] = apartment_histogram(
+        Apartment.area, without_args(args, 'area_min', 'area_max'),
+        args.get('area_bucket', type=int)
+    )
+
+    return jsonify(facets)
+
+
+###Route for "near me" search, distance sorted and combinable with the listing filters
+MAX_NEARBY_RADIUS_KM = 100
+
+
+@app.route('/apartments/nearby', methods=['GET'])
+@cached_response(apartment_list_tags)
+def get_nearby_apartments():
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    radius = request.args.get('radius', type=float, default=2)
+    page = max(request.args.get('page', type=int, default=1), 1)
+    limit = clamp_limit(request.args.get('limit', type=int))
+
+    if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({'error': 'Valid lat and lon are required'}), 400
+    if not 0 < radius <= MAX_NEARBY_RADIUS_KM:
+        return jsonify({'error': f'radius must be between 0 and {MAX_NEARBY_RADIUS_KM} km'}), 400
+
+    # Candidates come from the geo_cell index (one range per grid row of the
+    # bounding box); only id and coordinates are loaded for them
+    in_box = or_(*[Apartment.geo_cell.between(low, high) for low, high in cell_ranges(lat, lon, radius)])
+    candidates = apply_apartment_filters(
+        db.session.query(Apartment.id, Apartment.latitude, Apartment.longitude).filter(in_box),
+        request.args
+    ).all()
+
+    ranked = sorted(
+        (distance, apartment_id)
+        for apartment_id, a_lat, a_lon in candidates
+        for distance in [haversine_km(lat, lon, float(a_lat), float(a_lon))]
+        if distance <= radius
+    )
+    page_rows = ranked[(page - 1) * limit:page * limit]
+
+    apartments = {
+        a.id: a
+        for a in Apartment.query.options(joinedload(Apartment.owner))
+        .filter(Apartment.id.in_([apartment_id for _, apartment_id in page_rows]))
+    }
+
+    return jsonify({
+        'items': [
+            dict(APARTMENT_FIELDS.serialize(apartments[apartment_id]), distance_km=round(distance, 3))
+            for distance, apartment_id in page_rows if apartment_id in apartments
+        ],
+        'total': len(ranked),
+        'page': page,
+        'limit': limit
+    })
+
+
+###Route to export the (filtered) apartment listings for reporting
+APARTMENT_EXPORT_COLUMNS = [
+    Apartment.id, Apartment.owner_id,
+    User.full_name.label('owner_name'), User.email.label('owner_email'),
+    Apartment.location, Apartment.city, Apartment.unit_number, Apartment.price,
+    Apartment.area, Apartment.number_of_rooms, Apartment.type, Apartment.status,
+    Apartment.parking_availability, Apartment.map_location, Apartment.latitude,
+    Apartment.longitude, Apartment.description, Apartment.photos, Apartment.video,
+    Apartment.created_at
+]
+
+
+@app.route('/apartments/export', methods=['GET'])
+def export_apartments():
+    """Stream every apartment matching the get_apartments filters as NDJSON or CSV."""
+    fmt = request.args.get('format', default='ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    query = apply_apartment_filters(
+        db.session.query(*APARTMENT_EXPORT_COLUMNS).outerjoin(User, Apartment.owner),
+        request.args
+    ).order_by(Apartment.id)
+
+    return Response(
+        stream_with_context(stream_rows(query, fmt)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename=apartments.{fmt}'}
     )
 
+
+###Route to get spsfc app
+def latest_transaction_id():
+    """Correlated subquery: id of the apartment's most recent transaction (its current buyer)."""
+    return select(Transaction.id) \
+        .where(Transaction.apartment_id == Apartment.id) \
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc()) \
+        .limit(1) \
+        .correlate(Apartment) \
+        .scalar_subquery()
+
+
+# Apartment, owner, latest transaction and its buyer in one round trip; the
+# subquery is an index lookup on ix_transactions_apartment_id_created_at
+@app.route('/apartments/<int:id>', methods=['GET'])
+@cached_response(apartment_detail_tags)
+def get_apartment(id):
+    buyer = aliased(User)
+    apartment, buyer = db.session.query(Apartment, buyer) \
+        .options(*APARTMENT_FIELDS.load_options(APARTMENT_DETAIL),
+                 load_only(*[getattr(buyer, c) for c in USER_SUMMARY])) \
+        .outerjoin(Transaction, Transaction.id == latest_transaction_id()) \
+        .outerjoin(buyer, buyer.id == Transaction.user_id) \
+        .filter(Apartment.id == id) \
+        .first_or_404()
+
+    return jsonify(dict(
+        APARTMENT_FIELDS.serialize(apartment, APARTMENT_DETAIL),
+        buyer=USER_FIELDS.serialize(buyer, USER_SUMMARY) if buyer else None
+    ))
+
+
+###Helpers for the maintenance request listing
+FULLTEXT_WORD = re.compile(r'\w+', re.UNICODE)
+FULLTEXT_MIN_WORD_LENGTH = 3  # innodb_ft_min_token_size; shorter words are not indexed
+
+
+def description_filter(search_term):
+    """
+    Match maintenance request descriptions containing every word of
+    `search_term`. On MySQL this is a boolean-mode query on the
+    ft_maintenance_requests_description FULLTEXT index ('+leak* +sink*');
+    terms with words the index leaves out ("AC", "tv") and other databases
+    fall back to ILIKE '%term%'.
+    """
+    if db.session.connection().dialect.name == 'mysql':
+        words = FULLTEXT_WORD.findall(search_term)
+        if words and min(len(word) for word in words) >= FULLTEXT_MIN_WORD_LENGTH:
+            against = ' '.join(f'+{word}*' for word in words)
+            return match(MaintenanceRequest.description, against=against).in_boolean_mode()
+    return MaintenanceRequest.description.ilike(f'%{search_term}%')
+
+
+def apply_maintenance_filters(query, args):
+    """
+    Apply the get_maintenance_requests query-string filters.
+
+    `status` is matched exactly and `category` by prefix, so together with
+    user_id / technician_id they are answered by the (user_id, status,
+    request_date) and (technician_id, status, request_date) indexes.
+    Passing `match=substring` restores the old ILIKE '%x%' matching.
+    """
+    category = args.get('category', type=str)
+    status = args.get('status', type=str)
+    search_term = args.get('searchTerm', type=str)
+    user_id = args.get('user_id', type=int)
+    technician_id = args.get('technician_id', type=int)
+    substring = args.get('match', type=str) == 'substring'
+
     if category:
-        query = query.filter(MaintenanceRequest.problem_type.ilike(f'%{category}%'))
+        if substring:
+            query = query.filter(MaintenanceRequest.problem_type.ilike(f'%{category}%'))
+        else:
+            query = query.filter(MaintenanceRequest.problem_type.like(like_prefix(category), escape='\\'))
     if status:
-        query = query.filter(MaintenanceRequest.status.ilike(f'%{status}%'))
-    if search_term:
-        query = query.filter(MaintenanceRequest.description.ilike(f'%{search_term}%'))
+        if substring:
+            query = query.filter(MaintenanceRequest.status.ilike(f'%{status}%'))
+        else:
+            query = query.filter(MaintenanceRequest.status == canonical_enum_value(MaintenanceRequest.status, status))
+    if search_term and search_term.strip():
+        if substring:
+            query = query.filter(MaintenanceRequest.description.ilike(f'%{search_term}%'))
+        else:
+            query = query.filter(description_filter(search_term.strip()))
     if user_id is not None:
         query = query.filter(MaintenanceRequest.user_id == user_id)
+    if technician_id is not None:
+        query = query.filter(MaintenanceRequest.technician_id == technician_id)
 
-    requests = query.all()
-    return jsonify([r.to_dict() for r in requests])
+    return query
+
+
+###Route to list maintenance requests
+# `profile=summary` returns only the request's own list columns, without the
+# user/technician/apartment JOINs; `fields` picks an explicit projection.
+# Passing `limit` and/or `cursor` switches to keyset pagination ordered by
+# (request_date, id), newest first: {"items": [...], "next_cursor": "..."}.
+# Each page is a single SELECT whatever the table size or page depth.
+# Without them the full filtered list is returned as before.
+@app.route('/api/maintenance-requests', methods=['GET'])
+def get_maintenance_requests():
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', type=str)
+    profile = request.args.get('profile', type=str)
+    if profile is not None and profile not in MAINTENANCE_PROFILES:
+        return jsonify({'error': f"profile must be one of: {', '.join(MAINTENANCE_PROFILES)}"}), 400
+    try:
+        fields = MAINTENANCE_REQUEST_FIELDS.parse(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if fields is None and profile:
+        fields = set(MAINTENANCE_PROFILES[profile])
+
+    query = MaintenanceRequest.query.options(*MAINTENANCE_REQUEST_FIELDS.load_options(fields))
+    query = apply_maintenance_filters(query, request.args)
+
+    if limit is None and not cursor:
+        return jsonify([r.to_dict(fields=fields) for r in query.all()])
+
+    try:
+        requests, next_cursor = keyset_page(
+            query, MaintenanceRequest.request_date, MaintenanceRequest.id, cursor, limit
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'items': [r.to_dict(fields=fields) for r in requests],
+        'next_cursor': next_cursor
+    })
 
 @app.route('/api/maintenance-requests', methods=['POST'])
 def create_maintenance_request():
@@ -369,13 +739,7 @@ def create_maintenance_request():
                 files = request.files.getlist(file_key)
                 for file in files:
                     if file and allowed_file(file.filename):
-                        filename = secure_filename(file.filename)
-                        unique_name = f"{uuid.uuid4()}_{filename}"
-                        save_path = os.path.join(app.config['UPLOAD_FOLDER'], 'maintenance', unique_name)
-                        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                        file.save(save_path)
-                        relative_path = os.path.join('maintenance', unique_name).replace('\\', '/')
-                        image_paths.append(relative_path)
+                        image_paths.append(stored_path(store_upload(file), MAINTENANCE_IMAGES.relative))
 
         # Create the request
         new_request = MaintenanceRequest(
@@ -389,7 +753,10 @@ def create_maintenance_request():
         )
 
         db.session.add(new_request)
+        retain(image_paths)
         db.session.commit()
+        if image_paths:
+            derivative_pipeline.submit(MAINTENANCE_IMAGES, new_request.id)
 
         return jsonify({
             'message': 'Maintenance request submitted successfully!',
@@ -473,12 +840,44 @@ def update_maintenance_request(id):
             'details': str(e)
         }), 500
 
+###Technician availability
+ACTIVE_REQUEST_STATUSES = ['Pending', 'In Progress']
+
+
+def availability_filter(start, end=None):
+    """
+    Condition on User rows: the technician has no active maintenance request
+    and no 'Scheduled' appointment from `start` (to `end`, when given).
+
+    Both checks are NOT EXISTS subqueries correlated on the technician, so
+    the whole list is one query that MySQL runs as anti-joins on the
+    (technician_id, status, ...) indexes of both tables.
+    """
+    active_request = select(MaintenanceRequest.id).where(
+        MaintenanceRequest.technician_id == User.id,
+        MaintenanceRequest.status.in_(ACTIVE_REQUEST_STATUSES)
+    )
+    appointment = select(TechnicianSchedule.id).where(
+        TechnicianSchedule.technician_id == User.id,
+        TechnicianSchedule.status == 'Scheduled',
+        TechnicianSchedule.scheduled_date >= start
+    )
+    if end is not None:
+        appointment = appointment.where(TechnicianSchedule.scheduled_date <= end)
+    return ~active_request.exists() & ~appointment.exists()
+
+
+# status=available keeps technicians with no active request and no upcoming
+# appointment; available_from / available_to narrow the appointment check
+# to that window ("available between X and Y").
 @app.route('/api/technicians', methods=['GET'])
 def get_technicians():
     # Get query parameters
     name_filter = request.args.get('name', type=str)
     job_filter = request.args.get('job', type=str)
     status_filter = request.args.get('status', type=str)  # e.g., 'available'
+    available_from = request.args.get('available_from', type=str)
+    available_to = request.args.get('available_to', type=str)
     
     # Base query for technicians (role='Technician')
     query = User.query.filter_by(role='Technician')
@@ -489,44 +888,16 @@ def get_technicians():
     if job_filter:
         query = query.filter(User.job.ilike(f'%{job_filter}%'))
     
-    technicians = query.all()
-    
-    # For status filter, we might need to check their schedule
     if status_filter == 'available':
-        # Get current datetime
-        now = datetime.utcnow()
-        
-        # Get technicians with no scheduled maintenance in progress
-        available_techs = []
-        for tech in technicians:
-            # Check if they have any active maintenance requests
-            active_requests = MaintenanceRequest.query.filter(
-                MaintenanceRequest.technician_id == tech.id,
-                MaintenanceRequest.status.in_(['Pending', 'In Progress'])
-            ).count()
-            
-            # Check if they have any scheduled appointments now or in the future
-            scheduled_appointments = TechnicianSchedule.query.filter(
-                TechnicianSchedule.technician_id == tech.id,
-                TechnicianSchedule.scheduled_date >= now,
-                TechnicianSchedule.status == 'Scheduled'
-            ).count()
-            
-            if active_requests == 0 and scheduled_appointments == 0:
-                available_techs.append(tech)
-        
-        technicians = available_techs
+        start = parse_scheduled_date(available_from) if available_from else datetime.utcnow()
+        end = parse_scheduled_date(available_to) if available_to else None
+        if start is None or (available_to and end is None):
+            return jsonify({'error': 'available_from/available_to must be YYYY-MM-DD, YYYY-MM-DD HH:MM:SS or ISO dates'}), 400
+        if end is not None and end < start:
+            return jsonify({'error': 'available_to must not be before available_from'}), 400
+        query = query.filter(availability_filter(start, end))
     
-    return jsonify([{
-        'id': t.id,
-        'full_name': t.full_name,
-        'email': t.email,
-        'phone_number': t.phone_number,
-        'job': t.job,
-        'facebook_link': t.facebook_link,
-        'is_verified': t.is_verified,
-        'created_at': t.created_at
-    } for t in technicians])
+    return jsonify(USER_FIELDS.serialize_many(query.all(), USER_PROFILE))
 @app.route('/api/technicians/<int:technician_id>/profile', methods=['GET', 'PUT'])
 def technician_profile(technician_id):
     if request.method == 'GET':
@@ -603,15 +974,13 @@ def get_requests_for_technician(current_user, technician_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        requests = MaintenanceRequest.query.options(
-            joinedload(MaintenanceRequest.user),
-            joinedload(MaintenanceRequest.apartment)
-        ).filter_by(technician_id=technician_id).all()
+        requests = MaintenanceRequest.query.options(*MaintenanceRequest.load_profile('detail')) \
+            .filter_by(technician_id=technician_id).all()
         
         if not requests:
             return jsonify([]), 200  # Return empty array instead of error
             
-        return jsonify([r.to_dict() for r in requests])
+        return jsonify([r.to_dict(profile='detail') for r in requests])
     
     except Exception as e:
         logger.error(f"Error fetching requests: {str(e)}")
@@ -619,11 +988,9 @@ def get_requests_for_technician(current_user, technician_id):
 
 @app.route('/api/technician/<int:technician_id>/requests/pending', methods=['GET'])
 def get_pending_requests_for_technician(technician_id):
-    requests = MaintenanceRequest.query.options(
-        joinedload(MaintenanceRequest.user),
-        joinedload(MaintenanceRequest.apartment)
-    ).filter_by(technician_id=technician_id, status='Pending').all()
-    return jsonify([r.to_dict() for r in requests])
+    requests = MaintenanceRequest.query.options(*MaintenanceRequest.load_profile('detail')) \
+        .filter_by(technician_id=technician_id, status='Pending').all()
+    return jsonify([r.to_dict(profile='detail') for r in requests])
 
 @app.route('/api/maintenance-requests', methods=['GET'])
 @token_required  # If using JWT
@@ -638,13 +1005,10 @@ def get_requests_by_user(current_user):
         if current_user.id != user_id and current_user.role != 'Administrator':
             return jsonify({'error': 'Unauthorized'}), 403
 
-        requests = MaintenanceRequest.query.options(
-            joinedload(MaintenanceRequest.user),
-            joinedload(MaintenanceRequest.apartment),
-            joinedload(MaintenanceRequest.technician)
-        ).filter_by(user_id=user_id).all()
+        requests = MaintenanceRequest.query.options(*MaintenanceRequest.load_profile('detail')) \
+            .filter_by(user_id=user_id).all()
 
-        return jsonify([r.to_dict() for r in requests]), 200
+        return jsonify([r.to_dict(profile='detail') for r in requests]), 200
 
     except Exception as e:
         import traceback
@@ -652,31 +1016,31 @@ def get_requests_by_user(current_user):
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
 
+###Technician workload counters, maintained by Classes/workload.py
+MAX_STATS_IDS = 500
+
+
 @app.route('/api/technician/<int:technician_id>/stats', methods=['GET'])
 def get_technician_stats(technician_id):
-    # Count total non-rejected requests
-    total_requests = MaintenanceRequest.query.filter(
-        MaintenanceRequest.technician_id == technician_id,
-        MaintenanceRequest.status != 'Rejected'  # Explicitly exclude rejected
-    ).count()
-
-    # Count pending requests (already excludes rejected by status filter)
-    pending_requests = MaintenanceRequest.query.filter(
-        MaintenanceRequest.technician_id == technician_id,
-        MaintenanceRequest.status == 'Pending'
-    ).count()
-
-    # Count completed requests (using resolved statuses)
-    completed_requests = MaintenanceRequest.query.filter(
-        MaintenanceRequest.technician_id == technician_id,
-        MaintenanceRequest.status.in_(['Resolved', 'Completed'])
-    ).count()
+    return jsonify(workloads_for([technician_id])[technician_id])
 
-    return jsonify({
-        'total': total_requests,
-        'pending': pending_requests,
-        'completed': completed_requests
-    })
+
+# Stats of many technicians in one query: ?ids=1,2,3, or every technician
+# when ids is omitted. Returns {technician_id: {total, pending, ...}}.
+@app.route('/api/technicians/stats', methods=['GET'])
+def get_technicians_stats():
+    ids = request.args.get('ids', type=str)
+    if ids:
+        try:
+            technician_ids = sorted({int(i) for i in ids.split(',') if i.strip()})
+        except ValueError:
+            return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+        if len(technician_ids) > MAX_STATS_IDS:
+            return jsonify({'error': f'At most {MAX_STATS_IDS} ids per request'}), 400
+    else:
+        technician_ids = [i for (i,) in db.session.query(User.id).filter(User.role == 'Technician')]
+
+    return jsonify(workloads_for(technician_ids))
 def send_notification(user_id, title, message):
     print(f"Notification to user {user_id}: {title} - {message}")
 
@@ -786,6 +1150,7 @@ def update_apartment(id):
     description = request.form.get('description')
     price = request.form.get('price', type=int)
     status = request.form.get('status')
+    map_location = request.form.get('map_location')
 
     apartment.location = location or apartment.location
     apartment.city = city or apartment.city
@@ -795,7 +1160,11 @@ def update_apartment(id):
     apartment.type = apt_type or apartment.type
     apartment.description = description or apartment.description
     apartment.price = price or apartment.price
+    if status and status != apartment.status:
+        record_lease_change(apartment, ended=apartment.status == 'Rented', started=False)
     apartment.status = status or apartment.status
+    if map_location is not None:
+        apartment.map_location = map_location or None
 
     # --- Handle new image uploads ---
     new_photos = []
@@ -803,15 +1172,7 @@ def update_apartment(id):
         files = request.files.getlist('new_images')
         for file in files:
             if file and file.filename:
-                filename = secure_filename(file.filename)
-                unique_name = f"{uuid.uuid4()}_{filename}"
-                save_path = os.path.join(UPLOAD_FOLDER, unique_name)
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                file.save(save_path)
-
-                # Convert to web-safe path
-                photo_url = f"/{UPLOAD_FOLDER}/{unique_name}".replace('\\', '/')
-                new_photos.append(photo_url)
+                new_photos.append(store_upload(file))
 
 
     # --- Handle existing photos sent from client ---
@@ -820,17 +1181,30 @@ def update_apartment(id):
         try:
             import json
             existing_photos = json.loads(existing_photos)
+            # Listings hand out variant URLs; map them back to the stored originals
+            originals = {
+                url: path for path, urls in (apartment.photo_variants or {}).items() for url in urls.values()
+            }
             existing_photos = [
-                photo.replace("http://localhost:5000", "") for photo in existing_photos
+                originals.get(strip_media_base(photo), strip_media_base(photo)) for photo in existing_photos
             ]
         except:
             existing_photos = []
     else:
         existing_photos = []
 
+    dropped = update_references(apartment.photos, existing_photos + new_photos)
     apartment.photos = existing_photos + new_photos
+    apartment.photo_variants = {
+        path: urls for path, urls in (apartment.photo_variants or {}).items() if path in apartment.photos
+    } or None
 
     db.session.commit()
+    purge_unreferenced(dropped)
+    if new_photos:
+        derivative_pipeline.submit(APARTMENT_PHOTOS, apartment.id)
+    apartment_search_index.add(apartment)
+    response_cache.invalidate('apartments', f'apartment:{id}')
 
     return jsonify({'message': 'Apartment updated successfully'})
 
@@ -850,6 +1224,7 @@ def add_apartment():
     price = request.form.get('price', type=int)
     status = request.form.get('status', default='Available')
     owner_id = request.form.get('owner_id', type=int)
+    map_location = request.form.get('map_location')
 
     # Validate required fields
     if not all([location, unit_number, area, number_of_rooms, apt_type, price, status]):
@@ -861,14 +1236,7 @@ def add_apartment():
         files = request.files.getlist('photos')
         for file in files:
             if file:
-                filename = secure_filename(file.filename)
-                unique_name = f"{uuid.uuid4()}_{filename}"
-                save_path = os.path.join(UPLOAD_FOLDER, unique_name)
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                file.save(save_path)
-                # Convert to web-safe path
-                photo_url = f"/{UPLOAD_FOLDER}/{unique_name}".replace('\\', '/')
-                uploaded_photos.append(photo_url)
+                uploaded_photos.append(store_upload(file))
 
     # Create apartment instance
     new_apartment = Apartment(
@@ -882,86 +1250,422 @@ def add_apartment():
         description=description,
         price=price,
         status=status,
-        photos=uploaded_photos
+        photos=uploaded_photos,
+        map_location=map_location
     )
 
     db.session.add(new_apartment)
+    retain(uploaded_photos)
     db.session.commit()
+    if uploaded_photos:
+        derivative_pipeline.submit(APARTMENT_PHOTOS, new_apartment.id)
+    apartment_search_index.add(new_apartment)
+    response_cache.invalidate('apartments')
 
     return jsonify({'message': 'Apartment added successfully', 'id': new_apartment.id}), 201
 
 
+############### Route to bulk import apartments from a CSV or NDJSON file #################
+@app.route('/apartments/import', methods=['POST'])
+def bulk_import_apartments():
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'error': 'file is required'}), 400
+
+    fmt = request.form.get('format') or file.filename.rsplit('.', 1)[-1].lower()
+    if fmt == 'jsonl':
+        fmt = 'ndjson'
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'file must be CSV or NDJSON'}), 400
+
+    try:
+        inserted, errors = import_apartments(iter_records(file.stream, fmt))
+        message, read_failed = f'Imported {inserted} apartment(s)', False
+    except ImportFileError as e:  # undecodable bytes or broken CSV quoting part way through
+        inserted, errors = e.inserted, e.errors
+        message, read_failed = str(e), True
+
+    if inserted:
+        apartment_search_index.reset()
+        response_cache.invalidate('apartments')
+
+    return jsonify({
+        'message': message,
+        'inserted': inserted,
+        'failed': len(errors),
+        'errors': errors
+    }), 201 if inserted and not read_failed else 400
+
+
+############### Resumable (tus-style) uploads for large files #################
+# POST /uploads creates a session, PATCH appends chunks at Upload-Offset,
+# HEAD reports the offset to resume from, and /uploads/<id>/attach verifies
+# the finished file's sha256 and attaches it to an apartment or a
+# maintenance request. Each PATCH body is bounded by MAX_CONTENT_LENGTH.
+def tus_response(status=204, headers=None, body=None):
+    response = jsonify(body) if body is not None else Response(status=status)
+    response.status_code = status
+    response.headers['Tus-Resumable'] = TUS_VERSION
+    response.headers['Cache-Control'] = 'no-store'
+    for name, value in (headers or {}).items():
+        response.headers[name] = str(value)
+    return response
+
+
+def tus_error(e):
+    return tus_response(e.status, body={'error': str(e)})
+
+
+@app.route('/uploads', methods=['OPTIONS'])
+def upload_capabilities():
+    return tus_response(headers={
+        'Tus-Version': TUS_VERSION,
+        'Tus-Extension': TUS_EXTENSIONS,
+        'Tus-Checksum-Algorithm': TUS_CHECKSUM_ALGORITHMS,
+        'Tus-Max-Size': resumable_uploads.max_size
+    })
+
+
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    try:
+        length = int(request.headers.get('Upload-Length', ''))
+        upload_id = resumable_uploads.create(length, parse_metadata(request.headers.get('Upload-Metadata')))
+    except ValueError:
+        return tus_response(400, body={'error': 'Upload-Length header is required'})
+    except UploadError as e:
+        return tus_error(e)
+
+    return tus_response(201, headers={'Location': f'/uploads/{upload_id}', 'Upload-Offset': 0})
+
+
+@app.route('/uploads/<upload_id>', methods=['HEAD'])
+def upload_offset(upload_id):
+    try:
+        session = resumable_uploads.info(upload_id)
+    except UploadError as e:
+        return tus_response(e.status)
+    return tus_response(200, headers={'Upload-Offset': session['offset'], 'Upload-Length': session['length']})
+
+
+@app.route('/uploads/<upload_id>', methods=['PATCH'])
+def append_upload(upload_id):
+    if request.mimetype != 'application/offset+octet-stream':
+        return tus_response(415, body={'error': 'Content-Type must be application/offset+octet-stream'})
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        checksum = request.headers.get('Upload-Checksum')
+        new_offset = resumable_uploads.append(
+            upload_id, offset, request.stream, parse_checksum(checksum) if checksum else None
+        )
+    except ValueError:
+        return tus_response(400, body={'error': 'Upload-Offset header is required'})
+    except UploadError as e:
+        return tus_error(e)
+
+    return tus_response(headers={'Upload-Offset': new_offset})
+
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    try:
+        resumable_uploads.delete(upload_id)
+    except UploadError as e:
+        return tus_error(e)
+    return tus_response()
+
+
+@app.route('/uploads/<upload_id>/attach', methods=['POST'])
+def attach_upload(upload_id):
+    """Attach a finished upload: {"sha256", "apartment_id" + "field" (video|photos) or "maintenance_request_id"}."""
+    data = request.get_json(silent=True) or {}
+    apartment_id = data.get('apartment_id')
+    request_id = data.get('maintenance_request_id')
+    field = data.get('field', 'video' if apartment_id else 'images')
+
+    if bool(apartment_id) == bool(request_id):
+        return jsonify({'error': 'Exactly one of apartment_id or maintenance_request_id is required'}), 400
+    if apartment_id and field not in ('video', 'photos'):
+        return jsonify({'error': 'field must be video or photos'}), 400
+    if request_id and field != 'images':
+        return jsonify({'error': 'field must be images for a maintenance request'}), 400
+
+    try:
+        metadata = resumable_uploads.info(upload_id)['metadata']
+        sha256 = data.get('sha256') or metadata.get('checksum')
+        if not sha256:
+            return jsonify({'error': 'sha256 of the complete file is required'}), 400
+
+        # Same whitelist as the multipart upload routes; attached files are served from /static
+        allowed = ALLOWED_VIDEO_EXTENSIONS if field == 'video' else ALLOWED_EXTENSIONS
+        extension = upload_extension(metadata.get('filename')).lstrip('.')
+        if extension not in allowed:
+            return jsonify({'error': f"{field} must be one of: {', '.join(sorted(allowed))}"}), 400
+
+        row = Apartment.query.get(apartment_id) if apartment_id else MaintenanceRequest.query.get(request_id)
+        if row is None:
+            return jsonify({'error': 'Apartment not found' if apartment_id else 'Maintenance request not found'}), 404
+
+        path = resumable_uploads.finish(upload_id, sha256)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+
+    if apartment_id and field == 'video':
+        dropped = update_references([row.video] if row.video else [], [path])
+        row.video = path
+        media_set = None
+    elif apartment_id:
+        retain([path])
+        row.photos = (row.photos or []) + [path]
+        media_set = APARTMENT_PHOTOS
+    else:
+        path = stored_path(path, MAINTENANCE_IMAGES.relative)
+        retain([path])
+        row.images = (row.images if isinstance(row.images, list) else []) + [path]
+        media_set = MAINTENANCE_IMAGES
+
+    db.session.commit()
+    if media_set is None:
+        purge_unreferenced(dropped)
+    else:
+        derivative_pipeline.submit(media_set, row.id)
+    if apartment_id:
+        response_cache.invalidate('apartments', f'apartment:{row.id}')
+
+    return jsonify({'message': 'Upload attached', 'path': path}), 201
+
+
 ###Route to delete an apartment
 @app.route('/apartments/<int:id>', methods=['DELETE'])
 def delete_apartment(id):
     apartment = Apartment.query.get_or_404(id)
 
-    # Optionally: delete photo files from disk
-    for photo in apartment.photos or []:
-        try:
-            photo_path = os.path.join('.', photo.lstrip('/'))
-            if os.path.exists(photo_path):
-                os.remove(photo_path)
-        except Exception as e:
-            logger.warning(f"Could not delete file {photo}: {str(e)}")
+    media = (apartment.photos or []) + ([apartment.video] if apartment.video else [])
+    dropped = release(media)
 
     db.session.delete(apartment)
     db.session.commit()
 
+    # Blobs are removed once no other row references them; older per-upload
+    # files belong to this apartment alone
+    purge_unreferenced(dropped)
+    remove_upload_files([path for path in media if not is_blob(path)])
+    apartment_search_index.remove(id)
+    response_cache.invalidate('apartments', f'apartment:{id}')
+
     return jsonify({'message': 'Apartment deleted successfully'}), 200
 
 
 ################Payments Route#######################
+PAYMENT_BUCKETS = ('due', 'overdue', 'completed')
+PAYMENT_COLUMNS = [
+    Payment.id, Payment.transaction_id, Payment.amount, Payment.due_date, Payment.paid_date, Payment.status,
+    User.id.label('user_id'), User.full_name, User.email,
+    Apartment.id.label('apartment_id'), Apartment.location, Apartment.unit_number,
+]
+
+
+def payment_bucket():
+    """
+    SQL expression putting a payment in the due / overdue / completed
+    bucket, from the status stored by flask mark-overdue.
+    """
+    return case(
+        (Payment.status == 'Completed', 'completed'),
+        (Payment.status == 'Overdue', 'overdue'),
+        else_='due'
+    )
+
+
+def payment_bucket_filter(bucket):
+    """Index-friendly status condition equivalent to payment_bucket() == bucket."""
+    if bucket == 'completed':
+        return Payment.status == 'Completed'
+    if bucket == 'overdue':
+        return Payment.status == 'Overdue'
+    return or_(Payment.status == 'Pending', Payment.status.is_(None))
+
+
+def payments_query(args, *columns):
+    """Payments joined to their transaction, user and apartment, scoped by user_id / apartment_id."""
+    user_id = args.get('user_id', type=int)
+    apartment_id = args.get('apartment_id', type=int)
+
+    query = db.session.query(*PAYMENT_COLUMNS, *columns) \
+        .select_from(Payment) \
+        .join(Transaction, Transaction.id == Payment.transaction_id) \
+        .outerjoin(User, User.id == Transaction.user_id) \
+        .outerjoin(Apartment, Apartment.id == Transaction.apartment_id)
+    if user_id is not None:
+        query = query.filter(Transaction.user_id == user_id)
+    if apartment_id is not None:
+        query = query.filter(Transaction.apartment_id == apartment_id)
+    return query
+
+
+def payment_item(row):
+    return {
+        'id': row.id,
+        'transaction_id': row.transaction_id,
+        'amount': float(row.amount),
+        'due_date': row.due_date.strftime('%Y-%m-%d') if row.due_date else None,
+        'paid_date': row.paid_date.strftime('%Y-%m-%d') if row.paid_date else None,
+        'status': row.status,
+        'user': {
+            'id': row.user_id,
+            'full_name': row.full_name,
+            'email': row.email
+        } if row.user_id is not None else None,
+        'apartment': {
+            'id': row.apartment_id,
+            'location': row.location,
+            'unit_number': row.unit_number
+        } if row.apartment_id is not None else None
+    }
+
+
+# Payments split into due / overdue / completed, newest due date first and
+# those without a due date last.
+# user_id / apartment_id scope the list to one tenant or apartment.
+# Passing `limit` returns the first `limit` payments of every bucket from one
+# ranked query, with "totals" and a "next_cursors" entry per bucket; the next
+# page of a bucket is ?bucket=<name>&cursor=<next cursor>&limit=...
+# Without them every payment is returned as before.
 @app.route('/payments')
 def get_payments():
-    all_payments = Payment.query.all()
-    current_time = datetime.utcnow()
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', type=str)
+    bucket = request.args.get('bucket', type=str)
+
+    if bucket is not None or cursor:
+        if bucket not in PAYMENT_BUCKETS:
+            return jsonify({'error': f"bucket must be one of: {', '.join(PAYMENT_BUCKETS)}"}), 400
+        query = payments_query(request.args).filter(payment_bucket_filter(bucket))
+        try:
+            rows, next_cursor = keyset_page(query, Payment.due_date, Payment.id, cursor, limit, nullable=True)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'items': [payment_item(row) for row in rows], 'next_cursor': next_cursor})
+
+    bucket_column = payment_bucket().label('bucket')
+    if limit is None:
+        result = {name: [] for name in PAYMENT_BUCKETS}
+        for row in payments_query(request.args, bucket_column).order_by(Payment.due_date.desc(), Payment.id.desc()):
+            result[row.bucket].append(payment_item(row))
+        return jsonify(result)
+
+    limit = clamp_limit(limit)
+    ordering = (Payment.due_date.desc(), Payment.id.desc())
+    ranked = payments_query(
+        request.args,
+        bucket_column,
+        func.row_number().over(partition_by=payment_bucket(), order_by=ordering).label('bucket_rank'),
+        func.count().over(partition_by=payment_bucket()).label('bucket_total')
+    ).subquery()
+    rows = db.session.query(ranked).filter(ranked.c.bucket_rank <= limit) \
+        .order_by(ranked.c.bucket, ranked.c.bucket_rank)
+
+    result = {name: [] for name in PAYMENT_BUCKETS}
+    result['totals'] = {name: 0 for name in PAYMENT_BUCKETS}
+    result['next_cursors'] = {name: None for name in PAYMENT_BUCKETS}
+    for row in rows:
+        result[row.bucket].append(payment_item(row))
+        result['totals'][row.bucket] = row.bucket_total
+        if row.bucket_rank == limit and row.bucket_total > limit:
+            result['next_cursors'][row.bucket] = encode_cursor(row.due_date, row.id)
+    return jsonify(result)
 
-    due = []
-    overdue = []
-    completed = []
 
-    for payment in all_payments:
-        transaction = Transaction.query.get(payment.transaction_id)
-        
-        if not transaction:
-            continue  # skip this payment if transaction is missing
-
-        # Optional: fetch related user/apartment info
-        user = User.query.get(transaction.user_id)
-        apartment = Apartment.query.get(transaction.apartment_id)
-
-        payment_data = {
-            'id': payment.id,
-            'transaction_id': payment.transaction_id,
-            'amount': float(payment.amount),
-            'due_date': payment.due_date.strftime('%Y-%m-%d'),
-            'paid_date': payment.paid_date.strftime('%Y-%m-%d') if payment.paid_date else None,
-            'status': payment.status,
-            'user': {
-                'id': user.id,
-                'full_name': user.full_name,
-                'email': user.email
-            } if user else None,
-            'apartment': {
-                'id': apartment.id,
-                'location': apartment.location,
-                'unit_number': apartment.unit_number
-            } if apartment else None
-        }
-
-        if payment.status == 'Completed':
-            completed.append(payment_data)
-        elif payment.due_date < current_time:
-            overdue.append(payment_data)
-        else:
-            due.append(payment_data)
+###Route to export the transaction/payment ledger for accounting
+LEDGER_OWNER = aliased(User)
+LEDGER_EXPORT_COLUMNS = [
+    Transaction.id.label('transaction_id'), Transaction.created_at, Transaction.transaction_type,
+    Transaction.status.label('transaction_status'), Transaction.amount, Transaction.payment_method,
+    Payment.id.label('payment_id'), Payment.amount.label('payment_amount'), Payment.due_date,
+    Payment.paid_date, Payment.status.label('payment_status'),
+    Transaction.user_id, User.full_name.label('user_name'), User.email.label('user_email'),
+    Transaction.apartment_id, Apartment.unit_number, Apartment.location, Apartment.city,
+    Apartment.owner_id, LEDGER_OWNER.full_name.label('owner_name')
+]
+
+
+# One row per payment, or per transaction without payments, in transaction
+# date order. ?from= / ?to= are dates (YYYY-MM-DD, `to` inclusive) or
+# datetimes on transactions.created_at; owner_id, user_id and apartment_id
+# narrow it further. The single joined query is streamed from a server-side
+# cursor and ordered by the transaction only, so it walks
+# ix_transactions_created_at_id instead of sorting the joined rows first;
+# the payments of one transaction come in no particular order.
+@app.route('/ledger/export', methods=['GET'])
+def export_ledger():
+    """Stream the transaction and payment ledger as NDJSON or CSV."""
+    fmt = request.args.get('format', default='ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    bounds = {}
+    for name in ('from', 'to'):
+        value = request.args.get(name)
+        if value:
+            bounds[name] = parse_scheduled_date(value)
+            if bounds[name] is None:
+                return jsonify({'error': f"Invalid {name} date: {value}"}), 400
+            if name == 'to' and 'T' not in value and ':' not in value:
+                bounds[name] += timedelta(days=1)  # the whole last day
+
+    query = db.session.query(*LEDGER_EXPORT_COLUMNS) \
+        .select_from(Transaction) \
+        .outerjoin(Payment, Payment.transaction_id == Transaction.id) \
+        .outerjoin(User, User.id == Transaction.user_id) \
+        .outerjoin(Apartment, Apartment.id == Transaction.apartment_id) \
+        .outerjoin(LEDGER_OWNER, LEDGER_OWNER.id == Apartment.owner_id)
+    if 'from' in bounds:
+        query = query.filter(Transaction.created_at >= bounds['from'])
+    if 'to' in bounds:
+        query = query.filter(Transaction.created_at < bounds['to'])
+    for name, column in (('owner_id', Apartment.owner_id), ('user_id', Transaction.user_id),
+                         ('apartment_id', Transaction.apartment_id)):
+        value = request.args.get(name, type=int)
+        if value is not None:
+            query = query.filter(column == value)
+    query = query.order_by(Transaction.created_at, Transaction.id)
+
+    return Response(
+        stream_with_context(stream_rows(query, fmt)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename=ledger.{fmt}'}
+    )
 
-    return jsonify({
-        'due': due,
-        'overdue': overdue,
-        'completed': completed
-    })
+
+################Revenue and occupancy reports#######################
+# Read from the revenue_rollups / occupancy_rollups tables (Classes/rollups.py).
+# ?from=YYYY-MM&to=YYYY-MM (the last 12 months by default), optionally
+# narrowed by owner_id and city; one item per month and owner or city.
+def rollup_response(group_by):
+    try:
+        last_month = billing_period(request.args.get('to')).date()
+        first_month = billing_period(request.args.get('from')).date() if request.args.get('from') \
+            else next_month(last_month.replace(year=last_month.year - 1))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if first_month > last_month:
+        return jsonify({'error': 'from must not be after to'}), 400
+
+    return jsonify(rollup_report(
+        group_by, first_month, last_month,
+        owner_id=request.args.get('owner_id', type=int),
+        city=request.args.get('city', type=str)
+    ))
+
+
+@app.route('/api/rollups/owners', methods=['GET'])
+def get_owner_rollups():
+    return rollup_response('owner_id')
+
+
+@app.route('/api/rollups/cities', methods=['GET'])
+def get_city_rollups():
+    return rollup_response('city')
 
 
 
@@ -1028,8 +1732,13 @@ def get_contracts():
     apartment_id = request.args.get('apartment_id', type=int)
     contract_type = request.args.get('contract_type', type=str)
     status = request.args.get('status', type=str)
+    try:
+        fields = CONTRACT_FIELDS.parse(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    query = Contract.query
+    # contract_details is never listed, so it is left out of the SELECT
+    query = Contract.query.options(*CONTRACT_FIELDS.load_options(fields))
 
     if status == 'signed':
         query = query.filter(Contract.signed_by_buyer == True, Contract.signed_by_owner == True)
@@ -1049,24 +1758,7 @@ def get_contracts():
 
     contracts = query.all()
 
-    result = []
-    for c in contracts:
-        result.append({
-            'id': c.id,
-            'apartment_id': c.apartment_id,
-            'apartment_location': c.apartment.location if c.apartment else None,
-            'buyer_id': c.buyer_id,
-            'buyer_name': c.buyer.full_name if c.buyer else None,
-            'owner_id': c.owner_id,
-            'owner_name': c.owner.full_name if c.owner else None,
-            'contract_type': c.contract_type,
-            'signed_by_buyer': c.signed_by_buyer,
-            'signed_by_owner': c.signed_by_owner,
-            'created_at': c.created_at,
-            'finalized_at': c.finalized_at
-        })
-
-    return jsonify(result)
+    return jsonify(CONTRACT_FIELDS.serialize_many(contracts, fields))
 
 
 @app.route('/contracts/<int:id>', methods=['GET'])
@@ -1223,6 +1915,7 @@ def assign_apartment():
     transaction = Transaction(user_id=user_id, apartment_id=apartment_id)
     db.session.add(transaction)
     db.session.commit()
+    response_cache.invalidate(f'apartment:{apartment_id}', f'user:{user_id}')
 
     return jsonify({'message': 'Apartment assigned to user successfully'})
 
@@ -1236,6 +1929,7 @@ def update_status(apartment_id):
         userId = data.get('buyerId')
 
         apartment = Apartment.query.get_or_404(apartment_id)
+        was_rented = apartment.status == "Rented"
 
         # Update status
         if transaction_type == "Rent":
@@ -1257,11 +1951,22 @@ def update_status(apartment_id):
                 amount=transaction_data['amount'],
                 transaction_type=transaction_type,  # FIXED: correct type
                 payment_method=transaction_data['payment_method'],
-                status='Completed'
+                status='Completed',
+                created_at=datetime.utcnow()
             )
             db.session.add(transaction)
+            record_transaction(transaction, apartment)
+
+        # A new rent or sale ends the current lease, as does leaving Rented
+        new_lease = bool(transaction_data) and transaction_type in LEASE_BOUNDARY_TYPES
+        record_lease_change(
+            apartment,
+            ended=was_rented and (new_lease or apartment.status != "Rented"),
+            started=new_lease and transaction_type == "Rent"
+        )
 
         db.session.commit()
+        response_cache.invalidate('apartments', f'apartment:{apartment_id}', f'user:{userId}')
         return jsonify({'message': 'Status and transaction updated'})
     
     except Exception as e:
@@ -1278,9 +1983,256 @@ def remove_apartment_buyer():
     data = request.get_json()
     Transaction.query.filter_by(apartment_id=data['apartment_id']).delete()
     db.session.commit()
+    response_cache.invalidate(f"apartment:{data['apartment_id']}")
     return jsonify({'message': 'Buyer/tenant removed'})
 
 
 
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(response_cache.stats())
+
+
+############### CLI commands #################
+# Filter shapes sent by the buy/rent/admin apartment pages
+APARTMENT_FILTER_SHAPES = [
+    {'status': 'Available'},
+    {'status': 'Available', 'type': 'For Sale'},
+    {'status': 'Available', 'type': 'For Rent', 'price_min': '500', 'price_max': '2000'},
+    {'status': 'Available', 'type': 'For Sale', 'city': 'Ramallah'},
+    {'status': 'Available', 'type': 'For Sale', 'city': 'Ramallah', 'price_max': '200000'},
+    {'city': 'Ramallah'},
+    {'city': 'Ramallah', 'area_min': '80', 'area_max': '150'},
+]
+
+
+@app.cli.command('check-apartment-indexes')
+def check_apartment_indexes():
+    """
+    EXPLAIN every apartment filter shape and fail if one does not use an index.
+
+    Meant to be run against MySQL; SQLite's case-insensitive LIKE never uses
+    an index, so the city prefix shapes always report SCAN there.
+    """
+    failures = 0
+    for shape in APARTMENT_FILTER_SHAPES:
+        query = apply_apartment_filters(Apartment.query, MultiDict(shape))
+        indexes = used_indexes(query, Apartment.__tablename__)
+        label = '&'.join(f'{k}={v}' for k, v in shape.items())
+        if indexes:
+            print(f"OK    {label} -> {', '.join(indexes)}")
+        else:
+            failures += 1
+            print(f"SCAN  {label}")
+
+    if failures:
+        raise SystemExit(f"{failures} filter shape(s) do not use an index")
+
+
+@app.cli.command('backfill-coordinates')
+def backfill_coordinates():
+    """Parse map_location into latitude/longitude/geo_cell for rows that lack them."""
+    batch_size = 1000
+    last_id = 0
+    parsed = unparsed = 0
+
+    while True:
+        rows = db.session.query(Apartment.id, Apartment.map_location).filter(
+            Apartment.id > last_id,
+            Apartment.map_location.isnot(None),
+            Apartment.latitude.is_(None)
+        ).order_by(Apartment.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = []
+        for row in rows:
+            coordinates = parse_coordinates(row.map_location)
+            if not coordinates:
+                unparsed += 1
+                continue
+            updates.append({
+                'id': row.id,
+                'latitude': coordinates[0],
+                'longitude': coordinates[1],
+                'geo_cell': grid_cell(*coordinates)
+            })
+
+        if updates:
+            db.session.execute(update(Apartment), updates)
+            db.session.commit()
+        parsed += len(updates)
+
+    response_cache.invalidate('apartments')
+    print(f"Backfilled coordinates for {parsed} apartment(s), {unparsed} map_location value(s) could not be parsed")
+
+
+@app.cli.command('backfill-photo-variants')
+def backfill_photo_variants():
+    """Render thumbnail/card/full variants for uploaded photos that lack them."""
+    if not derivative_pipeline.enabled:
+        raise SystemExit("Pillow is not installed; no variants can be rendered")
+
+    batch_size = 100
+    for media_set in (APARTMENT_PHOTOS, MAINTENANCE_IMAGES):
+        model = media_set.model
+        last_id = 0
+        rows = rendered = 0
+
+        while True:
+            ids = [row_id for (row_id,) in db.session.query(model.id).filter(
+                model.id > last_id,
+                getattr(model, media_set.paths).isnot(None)
+            ).order_by(model.id).limit(batch_size)]
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            # Render the batch on the worker pool and wait for it
+            futures = [derivative_pipeline.submit(media_set, row_id) for row_id in ids]
+            for future in futures:
+                rendered += future.result() or 0
+            rows += len(ids)
+
+        print(f"{model.__tablename__}: checked {rows} row(s), rendered variants for {rendered} upload(s)")
+
+
+@app.cli.command('dedupe-uploads')
+def dedupe_uploads():
+    """Move per-upload files into the content-addressed blob store and recount references."""
+    batch_size = 500
+    moved = {}      # old web path -> blob web path
+    superseded = set()
+
+    for media_set in (APARTMENT_PHOTOS, MAINTENANCE_IMAGES):
+        model = media_set.model
+        paths_column = getattr(model, media_set.paths)
+        last_id = 0
+        rewritten = 0
+
+        while True:
+            rows = db.session.query(model.id, paths_column, getattr(model, media_set.variants)).filter(
+                model.id > last_id,
+                paths_column.isnot(None)
+            ).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            updates = []
+            for row_id, paths, variants in rows:
+                if not isinstance(paths, list):
+                    continue
+                new_paths = []
+                for path in paths:
+                    web_path = upload_web_path(path)
+                    if web_path and not is_blob(web_path) and web_path not in moved \
+                            and os.path.isfile(disk_path(web_path)):
+                        digest, size = hash_file(disk_path(web_path))
+                        moved[web_path] = store_file(disk_path(web_path), digest, size,
+                                                     upload_extension(web_path), keep_source=True)
+                        superseded.add(web_path)
+                    new_paths.append(stored_path(moved[web_path], media_set.relative)
+                                     if web_path in moved else path)
+                if new_paths != paths:
+                    # Variants are re-rendered under the blob path by backfill-photo-variants
+                    updates.append({'id': row_id, media_set.paths: new_paths, media_set.variants: {
+                        path: urls for path, urls in (variants or {}).items() if path in new_paths
+                    } or None})
+
+            if updates:
+                db.session.execute(update(model), updates)
+            db.session.commit()
+            rewritten += len(updates)
+
+        print(f"{model.__tablename__}: rewrote paths of {rewritten} row(s)")
+
+    # Old files are only removed once every row points at their blob
+    counts = recount_references(REFERENCED_MEDIA)
+    reclaimed = remove_upload_files(sorted(superseded))
+    response_cache.invalidate('apartments')
+    print(f"Stored {len(set(moved.values()))} distinct blob(s) for {len(moved)} upload(s), "
+          f"{len(counts)} referenced; removed {len(superseded)} old file(s), {reclaimed} bytes")
+
+
+@app.cli.command('gc-uploads')
+@click.option('--grace-hours', default=24.0, show_default=True,
+              help='Only collect files older than this, so uploads still being saved are kept.')
+@click.option('--quarantine', is_flag=True, help=f'Move orphans to {QUARANTINE_FOLDER} instead of deleting them.')
+@click.option('--dry-run', is_flag=True, help='Report what would be collected without touching files.')
+@click.option('--every', type=float, default=None, help='Keep running and collect every N minutes.')
+def gc_uploads(grace_hours, quarantine, dry_run, every):
+    """Delete upload files that no apartment or maintenance request references."""
+    while True:
+        expired = 0 if dry_run else resumable_uploads.expire()
+        stats = collect_garbage(REFERENCED_MEDIA, grace_hours * 3600, quarantine, dry_run)
+        action = 'would reclaim' if dry_run else ('quarantined' if quarantine else 'reclaimed')
+        print(f"Scanned {stats['scanned']} file(s), {stats['referenced']} referenced path(s): "
+              f"{stats['orphaned']} orphaned, {action} {stats['bytes']} bytes; "
+              f"{stats['young']} unreferenced file(s) within the grace period; "
+              f"{expired} stale resumable upload(s) expired")
+        if every is None:
+            break
+        db.session.remove()
+        time.sleep(every * 60)
+
+
+@app.cli.command('compress-assets')
+def compress_static_assets():
+    """Prebuild .br/.gz siblings of the Angular bundles and other text assets in static/."""
+    compressed, original_bytes, encoded_bytes = compress_assets(app.static_folder)
+    print(f"Compressed {compressed} file(s): {original_bytes} -> {encoded_bytes} bytes")
+
+
+@app.cli.command('mark-overdue')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows per UPDATE statement and transaction.')
+@click.option('--every', type=float, default=None, help='Keep running and mark every N minutes.')
+def mark_overdue_command(chunk_size, every):
+    """Mark past-due pending payments, and the transactions they belong to, as Overdue."""
+    while True:
+        run = mark_overdue(chunk_size=chunk_size)
+        print(f"Marked {run.details['payments']} payment(s) and {run.details['transactions']} "
+              f"transaction(s) overdue")
+        if every is None:
+            break
+        db.session.remove()
+        time.sleep(every * 60)
+
+
+@app.cli.command('generate-rent-payments')
+@click.option('--period', default=None, help='Billing month as YYYY-MM; defaults to the current month.')
+@click.option('--batch-size', default=1000, show_default=True, help='Payments per INSERT and transaction.')
+def generate_rent_payments_command(period, batch_size):
+    """Create the monthly rent payments of every active lease for a billing period."""
+    try:
+        start = billing_period(period)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--period')
+    run = generate_rent_payments(start, batch_size)
+    print(f"Created {run.details['payments']} rent payment(s) for {start:%Y-%m} "
+          f"in {(run.finished_at - run.started_at).total_seconds():.1f}s")
+
+
+@app.cli.command('reconcile-workloads')
+def reconcile_workloads():
+    """Rebuild technician_workloads from maintenance_requests."""
+    technicians = rebuild_workloads()
+    print(f"Rebuilt workload counters of {technicians} technician(s)")
+
+
+@app.cli.command('rebuild-rollups')
+@click.option('--since', default=None, help='First month to rebuild, as YYYY-MM; defaults to all history.')
+def rebuild_rollups_command(since):
+    """Recompute the revenue and occupancy rollups from transactions and apartments."""
+    try:
+        first_month = billing_period(since).date() if since else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--since')
+    run = rebuild_rollups(first_month)
+    print(f"Wrote {run.details['revenue_rollups']} revenue and {run.details['occupancy_rollups']} "
+          f"occupancy rollup row(s)")
+
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,133 @@
+# bench_maintenance_loading.py
+"""
+Query latency and SQL of maintenance request counts and list pages with
+the old mapper-level lazy='joined' relationships against the loader
+profiles. Runs on an in-memory SQLite database unless DATABASE_URL points
+at a copy of the real one.
+
+    python benchmarks/bench_maintenance_loading.py [rows] [iterations]
+
+Scenarios:
+  count         technician request count, as in get_technician_stats
+  list page     50 newest requests, serialized
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
+from Classes.config import db
+from Classes.Apartment import Apartment
+from Classes.MaintenanceRequest import MaintenanceRequest
+from Classes.User import User
+
+PAGE_SIZE = 50
+JOINED = [  # what lazy='joined' on the three relationships added to every query
+    joinedload(MaintenanceRequest.user),
+    joinedload(MaintenanceRequest.technician),
+    joinedload(MaintenanceRequest.apartment),
+]
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite://')
+    db.init_app(app)
+    return app
+
+
+def seed(count):
+    db.create_all()
+    if MaintenanceRequest.query.first() is not None:
+        return
+    owner = User(id=1, full_name='Owner', email='owner@example.com', phone_number='0590000001', role='Owner', password='x')
+    technicians = [
+        User(id=10 + i, full_name=f'Tech {i}', email=f'tech{i}@example.com', phone_number=f'05900001{i:02}',
+             role='Technician', password='x')
+        for i in range(20)
+    ]
+    apartments = [
+        Apartment(id=i + 1, owner_id=1, location=f'Main St {i}', city='Ramallah', price=1000, unit_number=f'U{i}',
+                  area=80, number_of_rooms=3, type='For Rent', description='flat', status='Available')
+        for i in range(200)
+    ]
+    db.session.add_all([owner, *technicians, *apartments])
+    db.session.flush()
+
+    statuses = ['Pending', 'In Progress', 'Resolved', 'Approved']
+    base = datetime(2025, 1, 1)
+    db.session.bulk_insert_mappings(MaintenanceRequest, [
+        {
+            'id': i + 1, 'user_id': 1, 'technician_id': 10 + i % 20, 'apartment_id': 1 + i % 200,
+            'problem_type': 'Plumbing', 'description': f'Leaking sink number {i}', 'status': statuses[i % 4],
+            'request_date': base + timedelta(minutes=i)
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def measure(label, run, iterations):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            result = run()
+            db.session.expunge_all()
+        elapsed = (time.perf_counter() - start) / iterations * 1000
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    joins = statements[-1].upper().count('JOIN') if statements else 0
+    print(f'{label:<24} {elapsed:>8.2f} ms  {len(statements) / iterations:>5.1f} queries  '
+          f'{joins} JOINs in last query')
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    app = make_app()
+    with app.app_context():
+        seed(count)
+        print(f'{MaintenanceRequest.query.count():,} maintenance requests, {db.engine.dialect.name}')
+
+        def count_query(*options):
+            return lambda: MaintenanceRequest.query.options(*options).filter(
+                MaintenanceRequest.technician_id == 10, MaintenanceRequest.status != 'Rejected'
+            ).count()
+
+        def newest_page(options, **to_dict):
+            def run():
+                rows = MaintenanceRequest.query.options(*options) \
+                    .order_by(MaintenanceRequest.request_date.desc(), MaintenanceRequest.id.desc()) \
+                    .limit(PAGE_SIZE).all()
+                return [r.to_dict(**to_dict) for r in rows]
+            return run
+
+        before = measure('count  before (joined)', count_query(*JOINED), iterations)
+        after = measure('count  after', count_query(), iterations)
+        assert before == after, 'count changed'
+
+        before = measure('page   before (joined)', newest_page(JOINED), iterations)
+        detail = measure('page   after (detail)', newest_page(MaintenanceRequest.load_profile('detail'), profile='detail'),
+                         iterations)
+        measure('page   after (summary)', newest_page(MaintenanceRequest.load_profile('summary'), profile='summary'),
+                iterations)
+        measure('page   lazy, no profile', newest_page([]), iterations)
+        assert before == detail, 'detail profile output changed'
+
+
+if __name__ == '__main__':
+    main()
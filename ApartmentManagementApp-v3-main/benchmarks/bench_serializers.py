@@ -0,0 +1,91 @@
+# bench_serializers.py
+"""
+Rows/sec of the apartment card shape: hand-written dict + Flask's default
+JSON provider (how the routes used to serialize) against the compiled
+APARTMENT_FIELDS plan + FastJSONProvider. No database is needed.
+
+    python benchmarks/bench_serializers.py [rows]
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from Classes.Apartment import APARTMENT_CARD, APARTMENT_FIELDS, Apartment
+from Classes.User import User
+from Classes.serializers import FastJSONProvider, orjson
+
+
+def make_rows(count):
+    owner = User(id=1, full_name='Owner', email='owner@example.com', phone_number='0590000000')
+    base = datetime(2025, 1, 1)
+    return [
+        Apartment(
+            id=i, owner_id=1, owner=owner, location=f'Main St {i}', city='Ramallah', price=1000 + i,
+            unit_number=f'U{i}', area=Decimal('85.50'), number_of_rooms=3, type='For Rent',
+            description='Sunny flat with a balcony', photos=['static/uploads/a.jpg', 'static/uploads/b.jpg'],
+            video=None, parking_availability=True, status='Available', created_at=base + timedelta(minutes=i)
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_item(a):
+    return {
+        'id': a.id,
+        'owner_id': a.owner_id,
+        'location': a.location,
+        'price': a.price,
+        'city': a.city,
+        'unit_number': a.unit_number,
+        'area': a.area,
+        'number_of_rooms': a.number_of_rooms,
+        'type': a.type,
+        'description': a.description,
+        'photos': [f"http://localhost:5000/{p}" for p in a.photos] if a.photos else [],
+        'video': f"http://localhost:5000/{a.video}" if a.video else None,
+        'parking_availability': bool(a.parking_availability),
+        'status': a.status,
+        'created_at': a.created_at,
+        'owner': {
+            'id': a.owner.id,
+            'full_name': a.owner.full_name,
+            'email': a.owner.email,
+            'phone_number': a.owner.phone_number
+        } if a.owner else None
+    }
+
+
+def timed(label, rows, build, provider):
+    start = time.perf_counter()
+    items = build(rows)
+    built = time.perf_counter()
+    body = provider.dumps(items)
+    done = time.perf_counter()
+    print(f'{label:<10} build {len(rows) / (built - start):>10,.0f} rows/s   '
+          f'encode {len(rows) / (done - built):>10,.0f} rows/s   '
+          f'total {len(rows) / (done - start):>10,.0f} rows/s')
+    return body
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    app = Flask(__name__)
+    rows = make_rows(count)
+    print(f'{count:,} apartment cards, orjson {"on" if orjson else "not installed"}')
+
+    before = timed('before', rows, lambda rs: [legacy_item(a) for a in rs], DefaultJSONProvider(app))
+    plan = APARTMENT_FIELDS.plan(APARTMENT_CARD)
+    after = timed('after', rows, lambda rs: [plan(a) for a in rs], FastJSONProvider(app))
+
+    assert json.loads(before) == json.loads(after), 'serialized output changed'
+
+
+if __name__ == '__main__':
+    main()
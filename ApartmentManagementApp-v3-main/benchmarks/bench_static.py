@@ -0,0 +1,96 @@
+# bench_static.py
+"""
+Bytes transferred and latency of Flask's default static handler against
+Classes/static_files.send_static, on a synthetic Angular bundle and video
+in a temporary static folder. No database is needed.
+
+    python benchmarks/bench_static.py [iterations]
+
+Scenarios:
+  first load    GET of the bundle by a browser sending Accept-Encoding
+  repeat visit  what a returning browser has to fetch: the default handler
+                makes it revalidate (304), immutable responses are served
+                from its cache without a request
+  video seek    Range request for 1 MiB in the middle of a 32 MiB video
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from Classes.static_files import compress_assets, configure_static_files
+
+BUNDLE = 'main-H7YQI7NF.js'
+VIDEO = 'uploads/blobs/ab/ab' + '0' * 62 + '.mp4'
+ACCEPT = {'Accept-Encoding': 'br, gzip'}
+
+
+def make_static_folder():
+    folder = tempfile.mkdtemp(prefix='bench-static-')
+    words = ['function', 'return', 'const', 'apartment', 'this', 'subscribe', '=>', '{', '}', ';']
+    rng = random.Random(7)
+    with open(os.path.join(folder, BUNDLE), 'w') as bundle:
+        bundle.write(' '.join(rng.choice(words) for _ in range(200_000)))
+    os.makedirs(os.path.dirname(os.path.join(folder, VIDEO)))
+    with open(os.path.join(folder, VIDEO), 'wb') as video:
+        video.write(os.urandom(32 * 1024 * 1024))
+    compress_assets(folder)
+    return folder
+
+
+def measure(client, path, headers, iterations):
+    total_bytes = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        response = client.get(path, headers=headers)
+        total_bytes += len(response.get_data())
+        response.close()
+    return total_bytes / iterations, (time.perf_counter() - start) / iterations * 1000, response
+
+
+def repeat_visit(client, path, iterations):
+    first = client.get(path, headers=ACCEPT)
+    cache_control = first.cache_control
+    if cache_control.immutable and cache_control.max_age:
+        return 0, 0.0, 'served from browser cache'
+    headers = dict(ACCEPT, **{'If-None-Match': first.get_etag()[0]})
+    size, latency, response = measure(client, path, headers, iterations)
+    return size, latency, f'{response.status_code} revalidation'
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    folder = make_static_folder()
+    apps = {
+        name: Flask(__name__, static_folder=folder, static_url_path='/static') for name in ('default', 'send_static')
+    }
+    configure_static_files(apps['send_static'])
+
+    try:
+        run(apps, iterations)
+    finally:
+        shutil.rmtree(folder)
+
+
+def run(apps, iterations):
+    middle = 16 * 1024 * 1024
+    seek = dict(ACCEPT, Range=f'bytes={middle}-{middle + 1024 * 1024 - 1}')
+    for name, app in apps.items():
+        client = app.test_client()
+        size, latency, response = measure(client, f'/static/{BUNDLE}', ACCEPT, iterations)
+        print(f"{name:<12} first load   {size:>12,.0f} bytes {latency:>8.2f} ms  "
+              f"encoding={response.headers.get('Content-Encoding', 'identity')} "
+              f"cache-control={response.headers.get('Cache-Control')}")
+        size, latency, note = repeat_visit(client, f'/static/{BUNDLE}', iterations)
+        print(f"{name:<12} repeat visit {size:>12,.0f} bytes {latency:>8.2f} ms  {note}")
+        size, latency, response = measure(client, f'/static/{VIDEO}', seek, iterations)
+        print(f"{name:<12} video seek   {size:>12,.0f} bytes {latency:>8.2f} ms  status={response.status_code}")
+
+
+if __name__ == '__main__':
+    main()
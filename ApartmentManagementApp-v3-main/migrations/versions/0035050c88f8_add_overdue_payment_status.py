@@ -0,0 +1,55 @@
+"""Add Overdue payment status and job runs
+
+Revision ID: 0035050c88f8
+Revises: 6637c6c1f9c8
+Create Date: 2026-10-18 16:47:03.291774
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = '0035050c88f8'
+down_revision = '6637c6c1f9c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.alter_column('status',
+               existing_type=mysql.ENUM('Pending', 'Completed'),
+               type_=sa.Enum('Pending', 'Completed', 'Overdue'),
+               existing_nullable=True)
+
+    op.create_table('job_runs',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=False),
+    sa.Column('rows_changed', sa.Integer(), nullable=False),
+    sa.Column('details', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job_runs', schema=None) as batch_op:
+        batch_op.create_index('ix_job_runs_name_started_at', ['name', 'started_at'], unique=False)
+
+    # The dashboard buckets on the stored status from now on; mark what is
+    # already past due (due dates are UTC). Later runs: flask mark-overdue
+    now = 'UTC_TIMESTAMP()' if op.get_bind().dialect.name == 'mysql' else 'CURRENT_TIMESTAMP'
+    op.execute(f"UPDATE payments SET status = 'Overdue' WHERE status = 'Pending' AND due_date < {now}")
+
+
+def downgrade():
+    op.execute("UPDATE payments SET status = 'Pending' WHERE status = 'Overdue'")
+
+    with op.batch_alter_table('job_runs', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_runs_name_started_at')
+    op.drop_table('job_runs')
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.alter_column('status',
+               existing_type=sa.Enum('Pending', 'Completed', 'Overdue'),
+               type_=mysql.ENUM('Pending', 'Completed'),
+               existing_nullable=True)
@@ -0,0 +1,61 @@
+"""Add unique payment (transaction_id, due_date) key and contract lease index
+
+Revision ID: 06fac10f737a
+Revises: 0035050c88f8
+Create Date: 2026-10-18 17:20:38.617092
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# Payments that share a (transaction_id, due_date) with a better one: paid
+# before overdue before pending, then the lowest id
+PAYMENT_RANK = "CASE {0}.status WHEN 'Completed' THEN 0 WHEN 'Overdue' THEN 1 ELSE 2 END"
+DUPLICATE_PAYMENTS = f"""
+    SELECT p.id, p.transaction_id, p.due_date, p.status, p.paid_date
+    FROM payments p
+    JOIN payments keep
+      ON keep.transaction_id = p.transaction_id AND keep.due_date = p.due_date
+     AND ({PAYMENT_RANK.format('keep')} < {PAYMENT_RANK.format('p')}
+          OR ({PAYMENT_RANK.format('keep')} = {PAYMENT_RANK.format('p')} AND keep.id < p.id))
+"""
+
+
+# revision identifiers, used by Alembic.
+revision = '06fac10f737a'
+down_revision = '0035050c88f8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Collapse duplicate payments first, or creating the unique key fails
+    # half way; the removed rows are logged
+    bind = op.get_bind()
+    duplicates = bind.execute(sa.text(DUPLICATE_PAYMENTS + " GROUP BY p.id, p.transaction_id, p.due_date, p.status, p.paid_date")).all()
+    if duplicates:
+        logger.warning(f"Removing {len(duplicates)} duplicate payment(s) (id, transaction_id, due_date, status, paid_date): "
+                       f"{[tuple(row) for row in duplicates]}")
+        # The derived table lets MySQL delete from the table it selects from
+        op.execute(f"DELETE FROM payments WHERE id IN (SELECT id FROM ({DUPLICATE_PAYMENTS}) AS duplicates)")
+
+    # The unique key also serves lookups by transaction_id
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_payments_transaction_due_date', ['transaction_id', 'due_date'])
+        batch_op.drop_index('ix_payments_transaction_id')
+
+    with op.batch_alter_table('contracts', schema=None) as batch_op:
+        batch_op.create_index('ix_contracts_apartment_id_buyer_id', ['apartment_id', 'buyer_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('contracts', schema=None) as batch_op:
+        batch_op.drop_index('ix_contracts_apartment_id_buyer_id')
+
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index('ix_payments_transaction_id', ['transaction_id'], unique=False)
+        batch_op.drop_constraint('uq_payments_transaction_due_date', type_='unique')
@@ -0,0 +1,31 @@
+"""Add apartment fulltext index
+
+Revision ID: 0ba42cbabf81
+Revises: dd920870a7c4
+Create Date: 2026-10-18 10:03:17.554902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0ba42cbabf81'
+down_revision = 'dd920870a7c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FULLTEXT only exists on MySQL; other databases use the in-process index
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.create_index('ft_apartments_text', 'apartments',
+                    ['location', 'city', 'unit_number', 'description'],
+                    unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.drop_index('ft_apartments_text', table_name='apartments')
@@ -0,0 +1,40 @@
+"""Add maintenance request listing indexes
+
+Revision ID: 36644c53bc24
+Revises: df397ab170eb
+Create Date: 2026-10-18 14:22:40.318725
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '36644c53bc24'
+down_revision = 'df397ab170eb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('maintenance_requests', schema=None) as batch_op:
+        batch_op.create_index('ix_maintenance_requests_user_status_date', ['user_id', 'status', 'request_date'], unique=False)
+        batch_op.create_index('ix_maintenance_requests_technician_status_date', ['technician_id', 'status', 'request_date'], unique=False)
+        batch_op.create_index('ix_maintenance_requests_status_date', ['status', 'request_date'], unique=False)
+        batch_op.create_index('ix_maintenance_requests_date_id', ['request_date', 'id'], unique=False)
+
+    # FULLTEXT only exists on MySQL; elsewhere searchTerm falls back to LIKE
+    if op.get_bind().dialect.name == 'mysql':
+        op.create_index('ft_maintenance_requests_description', 'maintenance_requests',
+                        ['description'], unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'mysql':
+        op.drop_index('ft_maintenance_requests_description', table_name='maintenance_requests')
+
+    with op.batch_alter_table('maintenance_requests', schema=None) as batch_op:
+        batch_op.drop_index('ix_maintenance_requests_date_id')
+        batch_op.drop_index('ix_maintenance_requests_status_date')
+        batch_op.drop_index('ix_maintenance_requests_technician_status_date')
+        batch_op.drop_index('ix_maintenance_requests_user_status_date')
@@ -0,0 +1,66 @@
+"""Add revenue and occupancy rollups
+
+Revision ID: 4dc0dbe703b1
+Revises: 06fac10f737a
+Create Date: 2026-10-18 18:02:47.305114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4dc0dbe703b1'
+down_revision = '06fac10f737a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('revenue_rollups',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('owner_id', sa.BigInteger(), nullable=False),
+    sa.Column('apartment_id', sa.BigInteger(), nullable=False),
+    sa.Column('transaction_type', sa.Enum('Rent', 'Sale', 'Maintenance'), nullable=False),
+    sa.Column('city', sa.String(length=255), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('transactions', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('month', 'owner_id', 'apartment_id', 'transaction_type')
+    )
+    with op.batch_alter_table('revenue_rollups', schema=None) as batch_op:
+        batch_op.create_index('ix_revenue_rollups_city_month', ['city', 'month'], unique=False)
+        batch_op.create_index('ix_revenue_rollups_owner_id_month', ['owner_id', 'month'], unique=False)
+
+    op.create_table('occupancy_rollups',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('owner_id', sa.BigInteger(), nullable=False),
+    sa.Column('apartment_id', sa.BigInteger(), nullable=False),
+    sa.Column('city', sa.String(length=255), nullable=False),
+    sa.Column('listed_days', sa.Integer(), nullable=False),
+    sa.Column('occupied_days', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('month', 'owner_id', 'apartment_id')
+    )
+    with op.batch_alter_table('occupancy_rollups', schema=None) as batch_op:
+        batch_op.create_index('ix_occupancy_rollups_city_month', ['city', 'month'], unique=False)
+        batch_op.create_index('ix_occupancy_rollups_owner_id_month', ['owner_id', 'month'], unique=False)
+
+    with op.batch_alter_table('apartments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status_changed_at', sa.DateTime(), nullable=True))
+
+    # The tables start empty; fill them with: flask rebuild-rollups
+
+
+def downgrade():
+    with op.batch_alter_table('apartments', schema=None) as batch_op:
+        batch_op.drop_column('status_changed_at')
+
+    with op.batch_alter_table('occupancy_rollups', schema=None) as batch_op:
+        batch_op.drop_index('ix_occupancy_rollups_owner_id_month')
+        batch_op.drop_index('ix_occupancy_rollups_city_month')
+
+    op.drop_table('occupancy_rollups')
+    with op.batch_alter_table('revenue_rollups', schema=None) as batch_op:
+        batch_op.drop_index('ix_revenue_rollups_owner_id_month')
+        batch_op.drop_index('ix_revenue_rollups_city_month')
+
+    op.drop_table('revenue_rollups')
@@ -0,0 +1,26 @@
+"""Add transactions (created_at, id) index for the ledger export
+
+Revision ID: 61dbb2fa45cc
+Revises: 4dc0dbe703b1
+Create Date: 2026-10-18 18:41:09.562830
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '61dbb2fa45cc'
+down_revision = '4dc0dbe703b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_transactions_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_transactions_created_at_id')
@@ -0,0 +1,28 @@
+"""Add payment dashboard indexes
+
+Revision ID: 6637c6c1f9c8
+Revises: 7c8cdb72cfbe
+Create Date: 2026-10-18 16:12:54.520318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6637c6c1f9c8'
+down_revision = '7c8cdb72cfbe'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index('ix_payments_status_due_date', ['status', 'due_date'], unique=False)
+        batch_op.create_index('ix_payments_transaction_id', ['transaction_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index('ix_payments_transaction_id')
+        batch_op.drop_index('ix_payments_status_due_date')
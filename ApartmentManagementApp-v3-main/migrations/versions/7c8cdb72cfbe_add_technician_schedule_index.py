@@ -0,0 +1,26 @@
+"""Add technician schedule availability index
+
+Revision ID: 7c8cdb72cfbe
+Revises: f5c04b8077a6
+Create Date: 2026-10-18 15:41:27.106354
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c8cdb72cfbe'
+down_revision = 'f5c04b8077a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('technician_schedule', schema=None) as batch_op:
+        batch_op.create_index('ix_technician_schedule_technician_status_date', ['technician_id', 'status', 'scheduled_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('technician_schedule', schema=None) as batch_op:
+        batch_op.drop_index('ix_technician_schedule_technician_status_date')
@@ -0,0 +1,34 @@
+"""Add apartment coordinates and geo cell
+
+Revision ID: 99147bb0b592
+Revises: 0ba42cbabf81
+Create Date: 2026-10-18 11:26:05.731840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '99147bb0b592'
+down_revision = '0ba42cbabf81'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('apartments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Numeric(precision=9, scale=6), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Numeric(precision=9, scale=6), nullable=True))
+        batch_op.add_column(sa.Column('geo_cell', sa.BigInteger(), nullable=True))
+        batch_op.create_index('ix_apartments_geo_cell', ['geo_cell'], unique=False)
+
+    # Existing rows are filled in by: flask backfill-coordinates
+
+
+def downgrade():
+    with op.batch_alter_table('apartments', schema=None) as batch_op:
+        batch_op.drop_index('ix_apartments_geo_cell')
+        batch_op.drop_column('geo_cell')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
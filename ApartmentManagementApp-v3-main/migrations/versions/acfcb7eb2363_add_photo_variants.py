@@ -0,0 +1,34 @@
+"""Add photo variant columns
+
+Revision ID: acfcb7eb2363
+Revises: f19e852d6244
+Create Date: 2026-10-18 12:41:19.508266
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'acfcb7eb2363'
+down_revision = 'f19e852d6244'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('apartments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('photo_variants', sa.JSON(), nullable=True))
+
+    with op.batch_alter_table('maintenance_requests', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_variants', sa.JSON(), nullable=True))
+
+    # Existing uploads are rendered by: flask backfill-photo-variants
+
+
+def downgrade():
+    with op.batch_alter_table('maintenance_requests', schema=None) as batch_op:
+        batch_op.drop_column('image_variants')
+
+    with op.batch_alter_table('apartments', schema=None) as batch_op:
+        batch_op.drop_column('photo_variants')
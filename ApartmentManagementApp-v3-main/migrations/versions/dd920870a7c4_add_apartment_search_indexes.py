@@ -0,0 +1,33 @@
+"""Add apartment search indexes
+
+Revision ID: dd920870a7c4
+Revises: a3595f55d0cc
+Create Date: 2026-10-18 09:12:41.208311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dd920870a7c4'
+down_revision = 'a3595f55d0cc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('apartments', schema=None) as batch_op:
+        # buy/rent pages: status=Available&type=... [+ city] [+ price range]
+        batch_op.create_index('ix_apartments_status_type_city_price', ['status', 'type', 'city', 'price'], unique=False)
+        # admin page: city [+ area range]
+        batch_op.create_index('ix_apartments_city_area', ['city', 'area'], unique=False)
+        # keyset pagination order of GET /apartments
+        batch_op.create_index('ix_apartments_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('apartments', schema=None) as batch_op:
+        batch_op.drop_index('ix_apartments_created_at_id')
+        batch_op.drop_index('ix_apartments_city_area')
+        batch_op.drop_index('ix_apartments_status_type_city_price')
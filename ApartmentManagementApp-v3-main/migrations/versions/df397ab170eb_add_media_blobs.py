@@ -0,0 +1,33 @@
+"""Add media blobs
+
+Revision ID: df397ab170eb
+Revises: acfcb7eb2363
+Create Date: 2026-10-18 13:17:52.640193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'df397ab170eb'
+down_revision = 'acfcb7eb2363'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('media_blobs',
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.PrimaryKeyConstraint('path')
+    )
+
+    # Existing uploads are moved into the blob store by: flask dedupe-uploads
+
+
+def downgrade():
+    op.drop_table('media_blobs')
@@ -0,0 +1,26 @@
+"""Add transactions (apartment_id, created_at) index
+
+Revision ID: f19e852d6244
+Revises: 99147bb0b592
+Create Date: 2026-10-18 12:04:37.215904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f19e852d6244'
+down_revision = '99147bb0b592'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_transactions_apartment_id_created_at', ['apartment_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_transactions_apartment_id_created_at')
@@ -0,0 +1,47 @@
+"""Add technician workloads
+
+Revision ID: f5c04b8077a6
+Revises: 36644c53bc24
+Create Date: 2026-10-18 15:06:11.842907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c04b8077a6'
+down_revision = '36644c53bc24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('technician_workloads',
+    sa.Column('technician_id', sa.BigInteger(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('pending', sa.Integer(), nullable=False),
+    sa.Column('in_progress', sa.Integer(), nullable=False),
+    sa.Column('resolved', sa.Integer(), nullable=False),
+    sa.Column('rejected', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['technician_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('technician_id')
+    )
+
+    # Counters of the existing requests; later drift is fixed by: flask reconcile-workloads
+    op.execute("""
+        INSERT INTO technician_workloads (technician_id, total, pending, in_progress, resolved, rejected)
+        SELECT technician_id,
+               SUM(CASE WHEN status <> 'Rejected' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'Pending' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'In Progress' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'Resolved' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'Rejected' THEN 1 ELSE 0 END)
+        FROM maintenance_requests
+        WHERE technician_id IS NOT NULL
+        GROUP BY technician_id
+    """)
+
+
+def downgrade():
+    op.drop_table('technician_workloads')
@@ -0,0 +1,62 @@
+# test_bulk_import.py
+"""
+Row validation of NDJSON apartment imports: values of the wrong JSON type
+must be reported as errors of their own row instead of failing the chunk.
+
+    python -m pytest tests
+"""
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from Classes.bulk_import import iter_records, validate_apartment_row
+
+VALID = {
+    'owner_id': 1, 'location': 'Main St 1', 'city': 'Ramallah', 'unit_number': 'A1', 'price': 900,
+    'area': 80, 'number_of_rooms': 3, 'type': 'For Rent', 'map_location': '31.9038, 35.2034',
+}
+
+
+def ndjson_rows(*records):
+    body = '\n'.join(json.dumps(record) for record in records).encode('utf-8')
+    return list(iter_records(io.BytesIO(body), 'ndjson'))
+
+
+def test_valid_row():
+    [(number, record)] = ndjson_rows(VALID)
+    values = validate_apartment_row(record)
+    assert number == 1
+    assert values['city'] == 'Ramallah'
+    assert values['geo_cell'] is not None
+
+
+@pytest.mark.parametrize('field, value', [
+    ('map_location', 123),
+    ('map_location', [31.9, 35.2]),
+    ('description', {'text': 'flat'}),
+    ('description', ['flat']),
+    ('video', ['/static/uploads/a.mp4']),
+    ('video', {'url': 'a.mp4'}),
+    ('type', ['For Rent']),
+    ('status', {'value': 'Available'}),
+])
+def test_non_string_values_are_row_errors(field, value):
+    [(_, record)] = ndjson_rows(dict(VALID, **{field: value}))
+    with pytest.raises(ValueError, match=field):
+        validate_apartment_row(record)
+
+
+def test_bad_row_does_not_affect_its_neighbours():
+    rows = ndjson_rows(VALID, dict(VALID, map_location=123), dict(VALID, unit_number='A2'))
+    outcomes = []
+    for number, record in rows:
+        try:
+            validate_apartment_row(record)
+            outcomes.append((number, 'ok'))
+        except ValueError as e:
+            outcomes.append((number, str(e)))
+    assert outcomes == [(1, 'ok'), (2, 'map_location must be a string'), (3, 'ok')]